@@ -1,8 +1,18 @@
+import asyncio
+import logging
 import os
-from typing import AsyncGenerator
-from sqlmodel import SQLModel
+import re
+import time
+from typing import AsyncGenerator, Optional
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 from app.models.vin import VIN
 from app.models.service_record import ServiceRecord
@@ -10,73 +20,162 @@ from app.models.contact import Contact
 from app.models.vin_contact_link import VINContactLink
 from app.models.scheduled_message import ScheduledMessage
 from app.models.incoming_message import IncomingMessage
-from sqlalchemy import text
+from app.models.vin_decode import VinDecode, VinPatternDecode
+from app.core.migrations import run_migrations
+from app.core.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT
+
+logger = logging.getLogger(__name__)
 
 # Load env vars from .env file
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable not set")
-
-# Force search_path=public to avoid missing-table issues after schema reset (Neon/PG)
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    connect_args={
-        "server_settings": {"search_path": "public"}
-    },
-)
+    if os.getenv("ENVIRONMENT") == "production":
+        raise ValueError("DATABASE_URL environment variable not set")
+    # Embedded database so development, CI and benchmarks need no server
+    DATABASE_URL = "sqlite+aiosqlite:///./autoshop.db"
+
+# Pool sizing is per worker process (gunicorn runs several), so size against max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# asyncpg prepared statement cache; set 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Optional streaming replica for heavy GET listings and reports
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# After a write, the same client reads from the primary for this long to hide replica lag
+READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+RECENT_WRITE_COOKIE = "db_recent_write"
+
+# How long a SQLite writer waits for another connection's write lock
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def sqlite_regexp_replace(value: Optional[str], pattern: str, replacement: str, flags: str) -> Optional[str]:
+    """Postgres regexp_replace for SQLite; 'g' replaces every match, otherwise only the first."""
+    if value is None:
+        return None
+    return re.sub(pattern, replacement, value, count=0 if "g" in flags else 1)
+
+
+def configure_sqlite_connection(dbapi_connection, _connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # WAL: readers never block the writer (or each other), and commits are cheaper
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+    # Functions used by the generated vin_reversed/plate_normalized columns
+    dbapi_connection.create_function("reverse", 1, lambda value: value[::-1] if value is not None else None, deterministic=True)
+    dbapi_connection.create_function("regexp_replace", 4, sqlite_regexp_replace, deterministic=True)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout took (waiting for a free connection or opening one) and pool timeouts."""
+
+    def connect(self):
+        started = time.perf_counter()
+        # logging_name survives dispose(), which rebuilds the pool
+        name = self.logging_name or "primary"
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc(name)
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started, name)
+
+
+def make_engine(url: str, name: str = "primary"):
+    if make_url(url).get_backend_name() == "sqlite":
+        # Meant for a single process (dev, CI, benchmarks); pool settings don't apply
+        sqlite_engine = create_async_engine(url, echo=False, poolclass=TimedQueuePool, pool_logging_name=name)
+        event.listen(sqlite_engine.sync_engine, "connect", configure_sqlite_connection)
+        return sqlite_engine
+    return create_async_engine(
+        make_url(url).update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}),
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_logging_name=name,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            # Force search_path=public to avoid missing-table issues after schema reset (Neon/PG)
+            "server_settings": {"search_path": "public"},
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+engine = make_engine(DATABASE_URL)
+read_engine = make_engine(DATABASE_READ_URL, "replica") if DATABASE_READ_URL else engine
+# "postgresql" or "sqlite"; the few backend-specific code paths branch on this
+DIALECT = engine.dialect.name
+
+
+def dialect_insert(table):
+    """INSERT with the backend's ON CONFLICT support (same API on Postgres and SQLite)."""
+    return sqlite_insert(table) if DIALECT == "sqlite" else pg_insert(table)
 
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+read_session = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
-async def init_db():
-    async with engine.begin() as conn:
-        # Drop the table if it exists to ensure a clean slate
-        try:
-            await conn.execute(text("DROP TABLE IF EXISTS incomingmessage"))
-        except Exception as e:
-            print(f"Could not drop IncomingMessage table: {e}")
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only routes: the replica when one is configured, unless this
+    client wrote recently (see ReadYourWritesMiddleware). Only for routes that
+    never write and whose results aren't stored in the read cache.
+    """
+    factory = async_session if request.cookies.get(RECENT_WRITE_COOKIE) else read_session
+    async with factory() as session:
+        yield session
 
-        await conn.run_sync(SQLModel.metadata.create_all)
 
-        # Best-effort: add service_record_id to scheduledmessage if it doesn't exist
-        try:
-            await conn.execute(text("ALTER TABLE scheduledmessage ADD COLUMN service_record_id INTEGER"))
-        except Exception:
-            # Column may already exist or dialect may differ; ignore
-            pass
-        try:
-            # Ensure index can exist in some DBs; ignore failures
-            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_scheduledmessage_service_record_id ON scheduledmessage(service_record_id)"))
-        except Exception:
-            pass
-        # Add is_reminder column (Postgres-safe) and backfill
-        try:
-            await conn.execute(text("ALTER TABLE IF EXISTS scheduledmessage ADD COLUMN IF NOT EXISTS is_reminder BOOLEAN DEFAULT FALSE"))
-        except Exception:
-            pass
-        try:
-            await conn.execute(text("UPDATE scheduledmessage SET is_reminder = TRUE WHERE is_reminder = FALSE AND LOWER(message_content) LIKE '%reminder%'"))
-        except Exception:
-            pass
-        # Add created_at column
-        try:
-            await conn.execute(text("ALTER TABLE IF EXISTS scheduledmessage ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()"))
-        except Exception:
-            pass
-        # Add cost tracking columns
-        try:
-            await conn.execute(text("ALTER TABLE IF EXISTS scheduledmessage ADD COLUMN IF NOT EXISTS cost_cents INTEGER"))
-        except Exception:
-            pass
-        try:
-            await conn.execute(text("ALTER TABLE IF EXISTS incomingmessage ADD COLUMN IF NOT EXISTS cost_cents INTEGER DEFAULT 10"))
-        except Exception:
-            pass
+class ReadYourWritesMiddleware:
+    """Marks clients that made a successful write so their next reads skip the replica."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if read_engine is engine or scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = f"{RECENT_WRITE_COOKIE}=1; Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+async def ping_database(db_engine, timeout: float = 2.0) -> float:
+    """Seconds for a SELECT 1 round trip (including checkout). Raises if it fails or takes longer than timeout."""
+    async def select_one():
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    started = time.perf_counter()
+    await asyncio.wait_for(select_one(), timeout)
+    return time.perf_counter() - started
+
+
+async def init_db():
+    # Versioned, lock-protected migrations; see app/core/migrations.py
+    await run_migrations(engine)
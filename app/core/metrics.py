@@ -0,0 +1,158 @@
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Seconds; front-desk requests should sit in the low buckets, imports and reports in the high ones
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    # Every series carries the worker's pid: each gunicorn worker keeps its own numbers
+    # and a scrape reaches whichever worker accepts it, so sum() across pids
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(("pid", *names), (os.getpid(), *values))]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[tuple, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] += amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] -= amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: count per bucket (last one is +Inf), sum, count
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests handled, by route template and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time to handle a request, until the last body byte was sent.", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests this worker is handling right now.")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool, including any wait and new connect.",
+    ("engine",), buckets=POOL_WAIT_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT.", ("engine",))
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured persistent connections.", ("engine",))
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections in use.", ("engine",))
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond db_pool_size (up to DB_MAX_OVERFLOW).", ("engine",))
+DB_UP = Gauge("db_up", "1 if SELECT 1 succeeded during this scrape.", ("engine",))
+DB_PING = Gauge("db_ping_seconds", "Round trip of SELECT 1 during this scrape.", ("engine",))
+PROCESS_START = Gauge("process_start_time_seconds", "Unix time the worker started.")
+PROCESS_START.set(time.time())
+
+
+def render_metrics() -> str:
+    """Everything in the Prometheus text exposition format (version 0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def _route_template(scope, root_path: str) -> str:
+    # The matched template, not the raw path, so /vin/{vin_or_last8} stays one series
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        # Routing into a mounted app (static files) extends root_path by the mount point
+        return f"{scope['root_path'][len(root_path):]}/*"
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Request count, latency histogram and in-flight gauge per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        root_path = scope.get("root_path", "")
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route_template(scope, root_path)
+            HTTP_LATENCY.observe(time.perf_counter() - started, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, status)
@@ -0,0 +1,173 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlmodel import SQLModel
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary app-wide key for pg_advisory_lock so only one worker migrates at a time
+MIGRATION_LOCK_ID = 730_100_039
+
+
+@dataclass
+class Migration:
+    """
+    One schema step. Versions are applied in order and recorded in schema_migrations.
+
+    The baseline builds a fresh database from the current models, so later
+    migrations must be idempotent (IF NOT EXISTS) to be safe on both fresh and
+    long-lived databases. Statements in an optional migration may fail (e.g. an
+    extension the host doesn't offer) without stopping startup.
+
+    statements are Postgres DDL. An embedded SQLite database runs
+    sqlite_statements instead; it always starts from the current models, so it
+    only needs what the models don't declare.
+    """
+    version: int
+    name: str
+    statements: List[str] = field(default_factory=list)
+    sqlite_statements: List[str] = field(default_factory=list)
+    run: Optional[Callable[[AsyncConnection], Awaitable[None]]] = None
+    optional: bool = False
+
+
+async def create_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(SQLModel.metadata.create_all)
+
+
+# Tenant-leading indexes both backends build the same way
+TENANT_LISTING_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_contact_tenant_name_id ON contact (tenant_id, name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_scheduledmessage_tenant_scheduled_time ON scheduledmessage (tenant_id, scheduled_time)",
+    "CREATE INDEX IF NOT EXISTS ix_scheduledmessage_tenant_created_at ON scheduledmessage (tenant_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_scheduledmessage_tenant_sent_at ON scheduledmessage (tenant_id, sent_at)",
+    "CREATE INDEX IF NOT EXISTS ix_incomingmessage_tenant_created_at ON incomingmessage (tenant_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_incomingmessage_tenant_unread ON incomingmessage (tenant_id) WHERE NOT is_read",
+]
+
+MIGRATIONS = [
+    Migration(1, "baseline tables", run=create_tables),
+    Migration(2, "scheduledmessage reminder and cost columns", [
+        "ALTER TABLE scheduledmessage ADD COLUMN IF NOT EXISTS service_record_id INTEGER",
+        "CREATE INDEX IF NOT EXISTS ix_scheduledmessage_service_record_id ON scheduledmessage (service_record_id)",
+        "ALTER TABLE scheduledmessage ADD COLUMN IF NOT EXISTS is_reminder BOOLEAN DEFAULT FALSE",
+        "UPDATE scheduledmessage SET is_reminder = TRUE WHERE is_reminder = FALSE AND LOWER(message_content) LIKE '%reminder%'",
+        "ALTER TABLE scheduledmessage ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()",
+        "ALTER TABLE scheduledmessage ADD COLUMN IF NOT EXISTS cost_cents INTEGER",
+        "ALTER TABLE incomingmessage ADD COLUMN IF NOT EXISTS cost_cents INTEGER DEFAULT 10",
+    ]),
+    # text_pattern_ops indexes serve prefix LIKE on reversed VINs and plates for
+    # /vin/lookup; (name, id) serves keyset pagination in /contacts/all
+    Migration(3, "lookup and foreign key indexes", [
+        "ALTER TABLE vin ADD COLUMN IF NOT EXISTS vin_reversed VARCHAR GENERATED ALWAYS AS (reverse(vin)) STORED",
+        "ALTER TABLE vin ADD COLUMN IF NOT EXISTS plate_normalized VARCHAR GENERATED ALWAYS AS (upper(regexp_replace(plate, '[^A-Za-z0-9]', '', 'g'))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_vin_vin_reversed ON vin (vin_reversed text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_vin_plate_normalized ON vin (plate_normalized text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_servicerecord_vin_id ON servicerecord (vin_id)",
+        "CREATE INDEX IF NOT EXISTS ix_scheduledmessage_vin_id ON scheduledmessage (vin_id)",
+        "CREATE INDEX IF NOT EXISTS ix_contact_name_id ON contact (name, id)",
+    ]),
+    # Trigram indexes serve the substring/ILIKE lookups in /contacts/search
+    Migration(4, "trigram contact search indexes", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_contact_phone_number_trgm ON contact USING gin (phone_number gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_contact_name_trgm ON contact USING gin (lower(name) gin_trgm_ops)",
+    ], optional=True),
+    # Existing rows belong to the original shop. Indexes lead with tenant_id so each
+    # shop's listings and lookups scan only its own rows; per-VIN child rows are
+    # already confined to one shop by their vin_id indexes.
+    Migration(5, "tenant_id with tenant-leading indexes", [
+        *(
+            statement
+            for table in ("vin", "contact", "vincontactlink", "servicerecord", "scheduledmessage", "incomingmessage")
+            for statement in (
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS tenant_id VARCHAR(32) NOT NULL DEFAULT 'montebello'",
+                f"ALTER TABLE {table} ALTER COLUMN tenant_id DROP DEFAULT",
+            )
+        ),
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_vin_tenant_vin ON vin (tenant_id, vin)",
+        "DROP INDEX IF EXISTS ix_vin_vin",
+        "CREATE INDEX IF NOT EXISTS ix_vin_tenant_vin_reversed ON vin (tenant_id, vin_reversed text_pattern_ops)",
+        "DROP INDEX IF EXISTS ix_vin_vin_reversed",
+        "CREATE INDEX IF NOT EXISTS ix_vin_tenant_plate_normalized ON vin (tenant_id, plate_normalized text_pattern_ops)",
+        "DROP INDEX IF EXISTS ix_vin_plate_normalized",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_contact_tenant_phone_number ON contact (tenant_id, phone_number)",
+        "DROP INDEX IF EXISTS ix_contact_phone_number",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_contact_tenant_email ON contact (tenant_id, email)",
+        "DROP INDEX IF EXISTS ix_contact_email",
+        "DROP INDEX IF EXISTS ix_contact_name_id",
+        *TENANT_LISTING_INDEXES,
+    ], sqlite_statements=[
+        "CREATE INDEX IF NOT EXISTS ix_vin_tenant_vin_reversed ON vin (tenant_id, vin_reversed)",
+        "CREATE INDEX IF NOT EXISTS ix_vin_tenant_plate_normalized ON vin (tenant_id, plate_normalized)",
+        *TENANT_LISTING_INDEXES,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT max(version) FROM schema_migrations"))).scalar() or 0
+    except DBAPIError:
+        # No schema_migrations table yet
+        return 0
+
+
+async def apply_migration(conn: AsyncConnection, migration: Migration) -> None:
+    statements = migration.sqlite_statements if conn.dialect.name == "sqlite" else migration.statements
+    async with conn.begin():
+        if migration.run:
+            await migration.run(conn)
+        for statement in statements:
+            if not migration.optional:
+                await conn.execute(text(statement))
+                continue
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text(statement))
+            except DBAPIError as e:
+                logger.warning("Skipped optional statement in migration %d: %s", migration.version, e.orig)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": migration.version, "name": migration.name},
+        )
+
+
+async def run_migrations(engine: AsyncEngine) -> None:
+    """Bring the schema to LATEST_VERSION. A current schema costs one query."""
+    if await current_version(engine) >= LATEST_VERSION:
+        logger.info("Schema is current (version %d)", LATEST_VERSION)
+        return
+
+    # SQLite is single-process (one file, one app) and serializes writers itself
+    use_lock = engine.dialect.name == "postgresql"
+    async with engine.connect() as conn:
+        if use_lock:
+            # Session-level lock: other workers wait here, then find nothing left to do
+            await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            await conn.commit()
+        try:
+            await conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+            ))
+            applied = set((await conn.execute(text("SELECT version FROM schema_migrations"))).scalars())
+            await conn.commit()
+
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+                logger.info("Applying migration %d: %s", migration.version, migration.name)
+                await apply_migration(conn, migration)
+        finally:
+            if use_lock:
+                await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                await conn.commit()
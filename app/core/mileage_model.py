@@ -0,0 +1,154 @@
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import DIALECT
+from app.core.reminders import reminder_send_time
+from app.models.scheduled_message import ScheduledMessage
+from app.models.service_record import ServiceRecord
+
+# A fitted rate needs at least two visits this far apart to be trusted
+MIN_HISTORY_SPAN_DAYS = 30
+# Plausible miles/day; outside this range the history is more likely typos than driving
+MIN_MILES_PER_DAY = 1.0
+MAX_MILES_PER_DAY = 250.0
+
+
+def to_days(dates) -> np.ndarray:
+    """Proleptic ordinal day numbers; much faster than building datetime64 from date objects."""
+    return np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+
+
+def fit_mileage_rates(vin_ids: np.ndarray, days: np.ndarray, miles: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Least-squares miles-per-day per VIN over its whole service history, computed
+    for all VINs at once with segmented reductions (no per-VIN Python loop).
+
+    Returns arrays aligned on the sorted unique VIN ids: vin_id, rate (NaN when
+    there's not enough history), and the date/mileage of each VIN's latest visit.
+    """
+    order = np.lexsort((days, vin_ids))
+    vin_ids, days, miles = vin_ids[order], days[order].astype(np.float64), miles[order].astype(np.float64)
+
+    unique_vins, starts, counts = np.unique(vin_ids, return_index=True, return_counts=True)
+    mean_x = np.add.reduceat(days, starts) / counts
+    mean_y = np.add.reduceat(miles, starts) / counts
+    dx = days - np.repeat(mean_x, counts)
+    dy = miles - np.repeat(mean_y, counts)
+    sxx = np.add.reduceat(dx * dx, starts)
+    sxy = np.add.reduceat(dx * dy, starts)
+
+    last = starts + counts - 1
+    span = days[last] - days[starts]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = sxy / sxx
+    unreliable = (counts < 2) | (span < MIN_HISTORY_SPAN_DAYS) | ~(rate >= MIN_MILES_PER_DAY) | (rate > MAX_MILES_PER_DAY)
+    rate[unreliable] = np.nan
+
+    return {
+        "vin_id": unique_vins,
+        "rate": rate,
+        "last_day": days[last].astype(np.int64),
+        "last_mileage": miles[last],
+    }
+
+
+def predict_due_days(
+    rate: np.ndarray, last_day: np.ndarray, last_mileage: np.ndarray,
+    target_mileage: np.ndarray, tech_due_day: np.ndarray,
+) -> np.ndarray:
+    """Day each vehicle reaches its target mileage at its fitted rate, never later than
+    the date the tech set (oil ages even when the car sits). Without a rate the tech's
+    date stands."""
+    with np.errstate(invalid="ignore"):
+        days_needed = np.ceil(np.maximum(target_mileage - last_mileage, 0) / rate)
+    predicted = last_day + np.nan_to_num(days_needed, nan=np.iinfo(np.int32).max).astype(np.int64)
+    return np.minimum(predicted, tech_due_day)
+
+
+async def load_history(session: AsyncSession, tenant_id: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Service history for every VIN (of one shop, if given) as columns (vin_id, day number, mileage)."""
+    # Core execution on the session's connection: plain tuples, no ORM row processing
+    # (and no automatic tenant filter, hence the explicit one)
+    query = select(ServiceRecord.vin_id, ServiceRecord.service_date, ServiceRecord.mileage_at_service)
+    if tenant_id is not None:
+        query = query.where(ServiceRecord.tenant_id == tenant_id)
+    connection = await session.connection()
+    result = await connection.execute(query)
+    rows = result.all()
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64)
+    vin_ids, dates, miles = zip(*rows)
+    return np.array(vin_ids, dtype=np.int64), to_days(dates), np.array(miles, dtype=np.float64)
+
+
+async def reschedule_reminders(session: AsyncSession, tenant_id: Optional[str] = None) -> dict:
+    """Move pending reminders to when each vehicle is predicted to be due. All shops unless tenant_id is given."""
+    vin_ids, days, miles = await load_history(session, tenant_id)
+    stats = {"vehicles": int(len(np.unique(vin_ids))), "fitted": 0, "pending": 0, "rescheduled": 0}
+    if not len(vin_ids):
+        return stats
+    model = fit_mileage_rates(vin_ids, days, miles)
+    stats["fitted"] = int(np.count_nonzero(~np.isnan(model["rate"])))
+
+    query = (
+        select(
+            ScheduledMessage.id, ScheduledMessage.vin_id, ScheduledMessage.scheduled_time,
+            ServiceRecord.next_service_mileage_due, ServiceRecord.next_service_date_due,
+        )
+        .join(ServiceRecord, ServiceRecord.id == ScheduledMessage.service_record_id)
+        .where(ScheduledMessage.status == "pending", ScheduledMessage.is_reminder == True)
+    )
+    if tenant_id is not None:
+        query = query.where(ScheduledMessage.tenant_id == tenant_id)
+    connection = await session.connection()
+    result = await connection.execute(query)
+    pending = result.all()
+    stats["pending"] = len(pending)
+    if not pending:
+        return stats
+    message_ids, message_vins, current_times, target_mileage, tech_due = zip(*pending)
+    message_vins = np.array(message_vins, dtype=np.int64)
+
+    # Line every reminder up with its vehicle's fit
+    position = np.searchsorted(model["vin_id"], message_vins)
+    position = np.minimum(position, len(model["vin_id"]) - 1)
+    due_day = predict_due_days(
+        model["rate"][position], model["last_day"][position], model["last_mileage"][position],
+        np.array(target_mileage, dtype=np.float64), to_days(tech_due),
+    )
+
+    # Send times depend on DST, so convert each distinct due date once
+    unique_days, inverse = np.unique(due_day, return_inverse=True)
+    send_times = [reminder_send_time(date.fromordinal(int(d))) for d in unique_days]
+    new_times = np.array(send_times, dtype="datetime64[us]")[inverse]
+    changed = np.flatnonzero(new_times != np.array(current_times, dtype="datetime64[us]"))
+    if not len(changed):
+        return stats
+
+    ids = [message_ids[i] for i in changed]
+    times = new_times[changed].astype(datetime).tolist()
+    if DIALECT == "sqlite":
+        # No arrays; an executemany of single-row updates is SQLite's batch path
+        table = ScheduledMessage.__table__
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam("message_id"), table.c.status == "pending")
+            .values(scheduled_time=bindparam("new_time")),
+            [{"message_id": i, "new_time": t} for i, t in zip(ids, times)],
+        )
+    else:
+        await session.execute(
+            text(
+                "UPDATE scheduledmessage AS m SET scheduled_time = v.scheduled_time "
+                "FROM unnest(CAST(:ids AS integer[]), CAST(:times AS timestamp[])) AS v(id, scheduled_time) "
+                "WHERE m.id = v.id AND m.status = 'pending'"
+            ),
+            {"ids": ids, "times": times},
+        )
+    await session.commit()
+    stats["rescheduled"] = int(len(changed))
+    return stats
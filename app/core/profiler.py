@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Requests sending "X-Profile: <token>" are profiled; unset disables the header trigger
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+# Oldest profiles are deleted beyond this many files
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# A runaway request stops being sampled after this long
+MAX_PROFILE_SECONDS = float(os.getenv("MAX_PROFILE_SECONDS", "60"))
+
+SCHEDULER_TARGET = "scheduler"
+PROFILE_SUFFIX = ".folded"
+
+# "<METHOD> <route template>" or SCHEDULER_TARGET -> how many more runs to profile.
+# Only touched from the event loop thread.
+armed: Dict[str, int] = {}
+
+
+def arm(target: str, count: int) -> None:
+    armed[target] = armed.get(target, 0) + count
+
+
+def take(target: str) -> bool:
+    """Use up one armed run for target, if any."""
+    remaining = armed.get(target)
+    if not remaining:
+        return False
+    if remaining == 1:
+        del armed[target]
+    else:
+        armed[target] = remaining - 1
+    return True
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, os.getcwd() + os.sep, os.path.dirname(os.__file__) + os.sep):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename})"
+
+
+def _awaiting_stack(coro) -> List[str]:
+    """Frames of a suspended coroutine chain, outermost first, ending in what it waits on."""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            if not hasattr(coro, "cr_frame") and not hasattr(coro, "gi_frame"):
+                # A Future or other awaitable: the I/O or lock being waited on
+                stack.append(f"[await {type(coro).__name__}]")
+            break
+        stack.append(_frame_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+class TaskSampler(threading.Thread):
+    """
+    Samples one asyncio task's stack every PROFILE_INTERVAL_MS from a side thread:
+    the loop thread's real stack while the task is running, and its await chain
+    while it is suspended, so waiting on the database shows up as well as CPU.
+    """
+
+    def __init__(self, task: asyncio.Task, path: str):
+        super().__init__(name="profiler", daemon=True)
+        self.task = task
+        self.loop = task.get_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.path = path
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+        self.root_code = task.get_coro().cr_code
+
+    def sample(self) -> None:
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.loop_thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame.f_code)
+                frame = frame.f_back
+            frames.reverse()
+            # Drop the event loop's own frames above the task
+            for i, code in enumerate(frames):
+                if code is self.root_code:
+                    frames = frames[i:]
+                    break
+            stack = [_frame_label(code) for code in frames]
+        else:
+            stack = _awaiting_stack(self.task.get_coro())
+        if stack:
+            self.stacks[";".join(stack)] += 1
+
+    def run(self) -> None:
+        deadline = time.monotonic() + MAX_PROFILE_SECONDS
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self.stopped.wait(interval) and time.monotonic() < deadline:
+            try:
+                self.sample()
+            except Exception:
+                # Frames can change under us; a lost sample doesn't matter
+                pass
+        self.write()
+
+    def write(self) -> None:
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(self.path, "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+            for old in list_profiles()[PROFILE_RING_SIZE:]:
+                os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError as e:
+            logger.warning("Profiler: could not write %s: %s", self.path, e)
+
+
+def list_profiles() -> List[str]:
+    """Profile file names, newest first."""
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if name.endswith(PROFILE_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+
+@contextmanager
+def profile_current_task(label: str) -> Iterator[str]:
+    """Sample the calling task until the block exits; yields the profile's file name."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")[:60]
+    name = f"{time.time_ns() // 1_000_000}-{os.getpid()}-{slug}{PROFILE_SUFFIX}"
+    sampler = TaskSampler(asyncio.current_task(), os.path.join(PROFILE_DIR, name))
+    sampler.start()
+    try:
+        yield name
+    finally:
+        # The sampler thread writes the file, so the loop never blocks on disk
+        sampler.stopped.set()
+
+
+@contextmanager
+def profile_if_armed(target: str) -> Iterator[Optional[str]]:
+    if not take(target):
+        yield None
+        return
+    with profile_current_task(target) as name:
+        yield name
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a request when it carries "X-Profile: <PROFILER_TOKEN>" or its route
+    is armed (POST /profiler/arm), and names the profile in X-Profile-Id. When
+    neither is possible this is a single check per request.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    def _target(self, scope) -> Optional[str]:
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return f"{scope['method']} {route.path}"
+        return None
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                return secrets.compare_digest(value, PROFILER_TOKEN.encode())
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (PROFILER_TOKEN or armed):
+            return await self.app(scope, receive, send)
+
+        target = None
+        if not (PROFILER_TOKEN and self._requested(scope)):
+            target = self._target(scope) if armed else None
+            if target is None or not take(target):
+                return await self.app(scope, receive, send)
+
+        with profile_current_task(target or f"{scope['method']} {scope['path']}") as name:
+            async def send_with_profile_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", name.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile_id)
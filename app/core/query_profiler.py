@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# The same statement shape this many times in one request is reported as a probable N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# X-DB-Queries / X-DB-Time reveal internals, so they're only sent outside production
+PROFILE_HEADERS = os.getenv("ENVIRONMENT", "development") != "production"
+
+_IN_LIST = re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL with whitespace collapsed and IN lists folded, so each id looked up in a loop maps to the same shape."""
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements run while it is the active collector: how many, how long, and how often each shape repeated."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list:
+        """(shape, count) of statements that ran at least threshold times, most frequent first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def describe(self) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {n} x {shape[:200]}" for shape, n in self.shapes.most_common(10)]
+        return "\n".join(lines)
+
+
+# Collector for the current request (or scheduler pass); None means nothing is profiled
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+# On Engine itself, so the primary, the read replica and any other engine are all covered
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if query_stats_var.get() is not None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats_var.get()
+    if stats is not None and conn.info.get("query_start_times"):
+        stats.record(statement, time.perf_counter() - conn.info["query_start_times"].pop())
+
+
+def report_repeated_queries(stats: QueryStats, label: str) -> None:
+    for shape, count in stats.repeated():
+        logger.warning(
+            "Probable N+1: same statement %d times in %s", count, label,
+            extra={"statement": shape[:300], "queries": stats.count},
+        )
+
+
+@contextmanager
+def profile_queries(label: Optional[str] = None) -> Iterator[QueryStats]:
+    """Collect the statements run inside the block; with a label, repeated shapes are logged on exit."""
+    stats = QueryStats()
+    token = query_stats_var.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats_var.reset(token)
+        if label:
+            report_repeated_queries(stats, label)
+
+
+class QueryProfilerMiddleware:
+    """
+    Counts SQL statements and DB time per request, logs probable N+1 patterns and,
+    outside production, reports the totals in X-DB-Queries and X-DB-Time (ms).
+    Headers reflect the statements run before the response started; a streaming
+    body's later queries are only in the log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_totals(message):
+            if message["type"] == "http.response.start" and PROFILE_HEADERS:
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time", f"{stats.seconds * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        with profile_queries(f"{scope['method']} {scope['path']}") as stats:
+            await self.app(scope, receive, send_with_totals)
+
+
+def assert_query_budget(response, max_queries: int) -> int:
+    """
+    Fail if a response (from TestClient, httpx or a running non-production server)
+    ran more than max_queries statements. Returns the count, e.g.
+
+        assert_query_budget(client.get("/messages/all-outbound"), 3)
+    """
+    header = response.headers.get("x-db-queries")
+    if header is None:
+        raise AssertionError("Response has no X-DB-Queries header; is ENVIRONMENT=production?")
+    count = int(header)
+    if count > max_queries:
+        raise AssertionError(
+            f"{response.request.method} {response.request.url.path} ran {count} queries "
+            f"(budget {max_queries}, {response.headers.get('x-db-time')} ms)"
+        )
+    return count
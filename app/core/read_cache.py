@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from app.core.cache import TTLCache
+from app.core.database import DIALECT, engine
+from app.core.tenancy import tenant_id_var
+
+logger = logging.getLogger(__name__)
+
+READ_CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL_SECONDS", "120"))
+READ_CACHE_MAXSIZE = int(os.getenv("READ_CACHE_MAXSIZE", "2000"))
+# Optional shared backend so every worker sees the same entries and invalidations
+READ_CACHE_REDIS_URL = os.getenv("READ_CACHE_REDIS_URL")
+# How often each worker checks that its invalidation listener is still connected
+READ_CACHE_LISTEN_CHECK_SECONDS = float(os.getenv("READ_CACHE_LISTEN_CHECK_SECONDS", "15"))
+
+# Tag carried by every entry; bumping it drops the whole cache
+ALL_TAG = "*"
+
+
+def vin_tag(vin_id: int) -> str:
+    return f"vin:{vin_id}"
+
+
+def tenant_tag(tenant_id: Optional[str]) -> str:
+    # Also carried by every entry, so one shop can drop its own entries
+    return f"tenant:{tenant_id or '-'}"
+
+
+# Partial-VIN lookups can resolve differently once another VIN is added
+VINS_TAG = "vins"
+
+
+class MemoryBackend:
+    """Per-worker entries. Other workers hear about invalidations via PostgresInvalidationBus."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.generations: Dict[str, int] = defaultdict(int)
+        self.epoch_counter = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, entry: dict) -> None:
+        self.entries.set(key, entry)
+
+    async def generations_for(self, tags: List[str]) -> List[int]:
+        return [self.generations.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self.generations[tag] += 1
+        self.epoch_counter += 1
+
+    async def epoch(self) -> int:
+        return self.epoch_counter
+
+    async def clear(self) -> None:
+        await self.bump([ALL_TAG])
+        self.entries.clear()
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class PostgresInvalidationBus:
+    """
+    Relays invalidations between workers that each hold a MemoryBackend, using
+    LISTEN/NOTIFY on the app database. Holds one pooled connection per worker
+    for the listener, and reopens it when it drops (database restart, idle
+    timeout); notifications sent in between are lost, so a reconnect drops the
+    worker's whole cache.
+    """
+
+    channel = "read_cache_invalidation"
+
+    def __init__(self, engine, check_seconds: float = READ_CACHE_LISTEN_CHECK_SECONDS):
+        self.engine = engine
+        self.check_seconds = check_seconds
+        self.connection = None
+        self.watcher = None
+        self.lost = asyncio.Event()
+        # Identifies this worker's own notifications, which it has already applied
+        self.worker_id = uuid.uuid4().hex
+
+    async def start(self, on_tags) -> None:
+        self.on_tags = on_tags
+        # Started first so a listener that fails to connect now is retried too
+        self.watcher = asyncio.create_task(self.watch())
+        await self.listen()
+
+    def listener(self, _connection, _pid, _channel, payload) -> None:
+        sender, _, tags = payload.partition("|")
+        if sender != self.worker_id:
+            self.on_tags(tags.split(","))
+
+    async def listen(self) -> None:
+        self.lost.clear()
+        self.connection = await self.engine.connect()
+        raw = (await self.connection.get_raw_connection()).driver_connection
+        await raw.add_listener(self.channel, self.listener)
+        raw.add_termination_listener(lambda _connection: self.lost.set())
+
+    async def alive(self) -> bool:
+        if self.connection is None or self.lost.is_set():
+            return False
+        try:
+            raw = (await self.connection.get_raw_connection()).driver_connection
+            # On the driver connection, so the listener never sits idle in a transaction
+            await asyncio.wait_for(raw.fetchval("SELECT 1"), timeout=self.check_seconds)
+            return True
+        except Exception:
+            return False
+
+    async def watch(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.lost.wait(), timeout=self.check_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if await self.alive():
+                continue
+            logger.warning("Read cache invalidation listener disconnected, reconnecting")
+            await self.close()
+            try:
+                await self.listen()
+            except Exception as e:
+                logger.warning("Read cache invalidation listener failed to reconnect: %s", e)
+                await self.close()
+                continue
+            # Whatever other workers invalidated while this one wasn't listening is unknown
+            self.on_tags([ALL_TAG])
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            try:
+                await connection.invalidate()
+                await connection.close()
+            except Exception:
+                # Already gone with the server; the pool just forgets it
+                pass
+
+    async def publish(self, tags: Iterable[str]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": f"{self.worker_id}|{','.join(tags)}"})
+
+    async def stop(self) -> None:
+        if self.watcher is not None:
+            self.watcher.cancel()
+            self.watcher = None
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+
+class RedisBackend:
+    """Shared entries in Redis. Values are stored as JSON with the cache TTL."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "readcache"):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.redis.get(f"{self.prefix}:entry:{key}")
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, entry: dict) -> None:
+        await self.redis.set(f"{self.prefix}:entry:{key}", json.dumps(entry), ex=self.ttl)
+
+    async def generations_for(self, tags: List[str]) -> List[int]:
+        values = await self.redis.mget([f"{self.prefix}:gen:{tag}" for tag in tags])
+        return [int(v) if v else 0 for v in values]
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self.prefix}:gen:{tag}")
+            pipe.incr(f"{self.prefix}:epoch")
+            await pipe.execute()
+
+    async def epoch(self) -> int:
+        return int(await self.redis.get(f"{self.prefix}:epoch") or 0)
+
+    async def clear(self) -> None:
+        await self.bump([ALL_TAG])
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ReadCache:
+    """
+    Read-through cache for API read models, invalidated by tag generations.
+
+    Each entry records the generation of its tags (e.g. "vin:42") when it was
+    stored; a write bumps the generations of the tags it touches, so stale
+    entries stop matching without having to know their keys. A load that raced
+    with any invalidation (epoch moved) is served but not stored.
+    """
+
+    def __init__(self, backend, bus=None):
+        self.backend = backend
+        self.bus = bus
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.invalidations = 0
+
+    @staticmethod
+    def entry_key(namespace: str, key: str) -> str:
+        # Same ids can be looked up by different shops; entries never cross tenants
+        return f"{tenant_id_var.get() or '-'}:{namespace}:{key}"
+
+    async def get(self, namespace: str, key: str) -> Any:
+        try:
+            entry = await self.backend.get(self.entry_key(namespace, key))
+            if entry is not None:
+                tags = list(entry["gens"])
+                if await self.backend.generations_for(tags) == [entry["gens"][t] for t in tags]:
+                    self.hits[namespace] += 1
+                    return entry["value"]
+        except Exception as e:
+            logger.warning("Read cache unavailable: %s", e)
+        self.misses[namespace] += 1
+        return None
+
+    async def epoch(self) -> Optional[int]:
+        try:
+            return await self.backend.epoch()
+        except Exception as e:
+            logger.warning("Read cache unavailable: %s", e)
+            return None
+
+    async def set(self, namespace: str, key: str, value: Any, tags: List[str], epoch: Optional[int]) -> None:
+        """Store value (JSON-compatible) if nothing was invalidated since epoch was read."""
+        if epoch is None:
+            return
+        tags = [ALL_TAG, tenant_tag(tenant_id_var.get()), *tags]
+        try:
+            if await self.backend.epoch() != epoch:
+                return
+            generations = await self.backend.generations_for(tags)
+            await self.backend.set(self.entry_key(namespace, key), {"value": value, "gens": dict(zip(tags, generations))})
+        except Exception as e:
+            logger.warning("Read cache unavailable: %s", e)
+
+    async def invalidate(self, *tags: str) -> None:
+        if not tags:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.bump(tags)
+            if self.bus:
+                await self.bus.publish(tags)
+        except Exception as e:
+            logger.warning("Read cache invalidation failed: %s", e)
+
+    async def clear(self, tenant_id: Optional[str] = None) -> None:
+        """Drop one shop's entries, or every shop's without tenant_id."""
+        await self.invalidate(tenant_tag(tenant_id) if tenant_id else ALL_TAG)
+
+    def apply_remote_invalidation(self, tags: List[str]) -> None:
+        # Called from the LISTEN callback; MemoryBackend.bump never awaits
+        self.backend.generations.update({tag: self.backend.generations[tag] + 1 for tag in tags})
+        self.backend.epoch_counter += 1
+
+    async def start(self) -> None:
+        if self.bus:
+            try:
+                await self.bus.start(self.apply_remote_invalidation)
+            except Exception as e:
+                logger.warning("Read cache invalidation listener failed to start: %s", e)
+
+    async def stop(self) -> None:
+        if self.bus:
+            await self.bus.stop()
+
+    def stats(self) -> dict:
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "invalidations": self.invalidations,
+            "namespaces": {
+                ns: {
+                    "hits": self.hits[ns],
+                    "misses": self.misses[ns],
+                    "hit_ratio": round(self.hits[ns] / ((self.hits[ns] + self.misses[ns]) or 1), 3),
+                }
+                for ns in namespaces
+            },
+        }
+
+
+def create_read_cache() -> ReadCache:
+    if READ_CACHE_REDIS_URL:
+        return ReadCache(RedisBackend(READ_CACHE_REDIS_URL, READ_CACHE_TTL_SECONDS))
+    backend = MemoryBackend(READ_CACHE_MAXSIZE, READ_CACHE_TTL_SECONDS)
+    if DIALECT != "postgresql":
+        # Embedded SQLite means a single process: nobody to notify
+        return ReadCache(backend)
+    return ReadCache(backend, PostgresInvalidationBus(engine))
+
+
+read_cache = create_read_cache()
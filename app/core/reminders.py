@@ -0,0 +1,40 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+# Reminders go out this many days before the due date, at 11:00 AM shop time
+REMINDER_LEAD_DAYS = 17
+REMINDER_SEND_TIME = time(11, 0, 0)
+SHOP_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+def format_date(dt: datetime) -> str:
+    try:
+        return dt.strftime("%b %d, %Y")
+    except Exception:
+        return str(dt)
+
+
+def build_reminder_message(
+    contact_name: str,
+    make: str,
+    model: str,
+    next_service_mileage_due: int,
+    next_service_date_due: date,
+    shop_signature: str,
+) -> str:
+    return (
+        f"Hi {contact_name}, friendly heads up: your {make} {model} is due for service at "
+        f"{next_service_mileage_due} mi or by {format_date(next_service_date_due)}. "
+        f"We'll be here when you're ready - {shop_signature} "
+        "Reply STOP to unsubscribe."
+    )
+
+
+def reminder_send_time(next_service_date_due: date) -> datetime:
+    """Scheduled time for a reminder, stored as naive UTC for comparison in the scheduler."""
+    reminder_send_date = next_service_date_due - timedelta(days=REMINDER_LEAD_DAYS)
+    return (
+        datetime.combine(reminder_send_date, REMINDER_SEND_TIME, tzinfo=SHOP_TIMEZONE)
+        .astimezone(ZoneInfo("UTC"))
+        .replace(tzinfo=None)
+    )
@@ -0,0 +1,91 @@
+import os
+from decimal import Decimal
+from typing import Any, Dict, List, Literal, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+# Responses at least this big are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+# Dynamic responses are compressed per request, so favour speed over the last few percent
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+# Progress streams are read line by line as they arrive; gzip would hold them back
+UNCOMPRESSED_CONTENT_TYPES = ("application/x-ndjson", "text/event-stream")
+
+ListingShape = Literal["rows", "columnar"]
+
+
+def _default(value: Any) -> Any:
+    # What orjson doesn't handle natively but routes return
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    The app's default response class: orjson instead of json.dumps. Routes that
+    return it directly also skip FastAPI's jsonable_encoder pass, which is most of
+    the cost of a large listing.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class _StreamingSafeGZipResponder(GZipResponder):
+    async def send_with_compression(self, message) -> None:
+        if message["type"] == "http.response.start":
+            await super().send_with_compression(message)
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(UNCOMPRESSED_CONTENT_TYPES):
+                self.content_type_is_excluded = True
+            return
+        if message["type"] == "http.response.body" and not self.started and message.get("more_body", False):
+            # A streamed body: pass each chunk on as it's produced instead of buffering it in the compressor
+            self.content_type_is_excluded = True
+        await super().send_with_compression(message)
+
+
+class StreamingSafeGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves NDJSON/event streams and other streamed bodies uncompressed."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            responder = _StreamingSafeGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            return await responder(scope, receive, send)
+        await super().__call__(scope, receive, send)
+
+
+def columnar(rows: List[dict], fields: Tuple[str, ...], lookups: Dict[str, Tuple[str, ...]]) -> dict:
+    """
+    Rows as one array per field, with a column for every name in fields even when
+    there are no rows. Each group of fields in lookups (e.g. "contacts":
+    ("contact_name", "contact_phone")) is stored once per distinct value in
+    lookups[name] and replaced in columns by an index column of the same name, so
+
+        row[field] == lookups[name][field][columns[name][i]]
+    """
+    grouped = {field for group in lookups.values() for field in group}
+    columns = {field: [row[field] for row in rows] for field in fields if field not in grouped}
+    tables = {}
+    for name, group in lookups.items():
+        positions: Dict[tuple, int] = {}
+        index = []
+        for row in rows:
+            key = tuple(row[field] for field in group)
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = len(positions)
+            index.append(position)
+        columns[name] = index
+        tables[name] = {field: [key[i] for key in positions] for i, field in enumerate(group)}
+    return {"shape": "columnar", "columns": columns, "lookups": tables}
@@ -1,15 +1,23 @@
 import asyncio
+import logging
 from datetime import datetime, timezone
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_session
 from app.core.sms import send_sms
+from app.core.mileage_model import reschedule_reminders
 from app.models.scheduled_message import ScheduledMessage
 from app.models.contact import Contact
 from app.models.vin import VIN
+from app.core.logging_config import mask_phone
+from app.core.tenancy import shop_for
+from app.core.query_profiler import profile_queries
+from app.core.profiler import SCHEDULER_TARGET, profile_if_armed
+
+logger = logging.getLogger(__name__)
 
 async def send_scheduled_messages():
-    print("Scheduler: Checking for scheduled messages...")
+    logger.debug("Scheduler: Checking for scheduled messages...")
     async for session in get_session():
         try:
             # Stored scheduled_time is naive UTC; compare to current UTC naive
@@ -29,25 +37,36 @@ async def send_scheduled_messages():
                 vin = await session.get(VIN, msg.vin_id)
 
                 if contact and contact.phone_number:
-                    print(f"Scheduler: Sending message to {contact.phone_number} for VIN {vin.vin[-6:]}...")
-                    success = await send_sms(contact.phone_number, msg.message_content)
+                    logger.info("Scheduler: Sending message %s for VIN %s", msg.id, vin.vin[-6:], extra={"phone": mask_phone(contact.phone_number)})
+                    success = await send_sms(contact.phone_number, msg.message_content, from_number=shop_for(msg.tenant_id).sms_number)
                     if success:
                         msg.status = "sent"
                         msg.sent_at = datetime.now(timezone.utc).replace(tzinfo=None)
                         # msg.cost_cents = 10  # Set cost when message is successfully sent - Temporarily disabled
-                        print(f"Scheduler: Message {msg.id} sent successfully. Cost: $0.10")
+                        logger.info("Scheduler: Message %s sent successfully. Cost: $0.10", msg.id)
                     else:
                         msg.status = "failed"
-                        print(f"Scheduler: Failed to send message {msg.id}.")
+                        logger.warning("Scheduler: Failed to send message %s.", msg.id)
                 else:
                     msg.status = "failed" # No contact or phone number
-                    print(f"Scheduler: Message {msg.id} failed: No valid contact or phone number.")
+                    logger.warning("Scheduler: Message %s failed: No valid contact or phone number.", msg.id)
                 
                 session.add(msg)
             
             await session.commit()
         except Exception as e:
-            print(f"Scheduler Error: {e}")
+            logger.exception("Scheduler Error: %s", e)
+        finally:
+            await session.close()
+
+async def reschedule_pending_reminders():
+    logger.info("Scheduler: Re-planning pending reminders from driving history...")
+    async for session in get_session():
+        try:
+            stats = await reschedule_reminders(session)
+            logger.info("Scheduler: Reminder re-planning done", extra=stats)
+        except Exception as e:
+            logger.exception("Scheduler Error (reminder re-planning): %s", e)
         finally:
             await session.close()
 
@@ -57,18 +76,28 @@ async def start_scheduler():
     """
     consecutive_failures = 0
     max_failures = 5
+    last_replan_date = None
     
     while True:
         try:
-            await send_scheduled_messages()
+            # One tick is profiled per "scheduler" run armed via POST /profiler/arm
+            with profile_if_armed(SCHEDULER_TARGET):
+                # Once a day, before sending, so today's sends use the updated times
+                today = datetime.now(timezone.utc).date()
+                if today != last_replan_date:
+                    with profile_queries("scheduler: reminder re-planning"):
+                        await reschedule_pending_reminders()
+                    last_replan_date = today
+                with profile_queries("scheduler: sending due messages"):
+                    await send_scheduled_messages()
             consecutive_failures = 0  # Reset on success
             await asyncio.sleep(60)  # Check every 60 seconds
         except Exception as e:
             consecutive_failures += 1
-            print(f"Scheduler fatal error ({consecutive_failures}/{max_failures}): {e}")
+            logger.error("Scheduler fatal error (%d/%d): %s", consecutive_failures, max_failures, e)
             
             if consecutive_failures >= max_failures:
-                print("Scheduler: Too many consecutive failures, extending sleep time")
+                logger.error("Scheduler: Too many consecutive failures, extending sleep time")
                 await asyncio.sleep(300)  # Sleep 5 minutes on repeated failures
                 consecutive_failures = 0  # Reset after extended sleep
             else:
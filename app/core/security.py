@@ -1,7 +1,9 @@
 import os
+import secrets
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from dotenv import load_dotenv
+from app.core.tenancy import tenant_id_var
 
 load_dotenv()
 
@@ -21,3 +23,18 @@ def get_current_username(credentials: HTTPBasicCredentials = Depends(security)):
             headers={"WWW-Authenticate": "Basic"},
         )
     return credentials.username
+
+# --- Multi-tenant Basic Auth: the username is the shop's tenant_id ---
+TENANT_CREDENTIALS = {
+    "montebello": os.getenv("SHOP_PASSWORD_MONTEBELLO", "mblnt25"),
+    "eastlube": os.getenv("SHOP_PASSWORD_EASTLUBE", "eastlube456")
+}
+
+# async so the tenant set here is visible to the route and its queries (sync
+# dependencies run in a worker thread with a copied context)
+async def get_current_user(credentials: HTTPBasicCredentials = Depends(HTTPBasic())):
+    correct_password = TENANT_CREDENTIALS.get(credentials.username)
+    if not correct_password or not secrets.compare_digest(credentials.password.encode('utf-8'), correct_password.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    tenant_id_var.set(credentials.username)
+    return credentials.username
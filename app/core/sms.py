@@ -1,9 +1,14 @@
+import logging
 import os
 import re
 import time
 from collections import defaultdict
+from typing import Optional
 from twilio.rest import Client
 from dotenv import load_dotenv
+from app.core.logging_config import mask_phone
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -43,31 +48,32 @@ def record_message_sent(phone: str):
     """Record that a message was sent to this phone number"""
     message_history[phone].append(time.time())
 
-async def send_sms(to_phone_number: str, message_body: str):
+async def send_sms(to_phone_number: str, message_body: str, from_number: Optional[str] = None):
     """
-    Send SMS with safety checks and rate limiting
+    Send SMS with safety checks and rate limiting. from_number defaults to TWILIO_PHONE_NUMBER.
     """
+    from_number = from_number or TWILIO_PHONE_NUMBER
     if not client:
-        print("Twilio client not initialized. SMS will not be sent.")
+        logger.warning("Twilio client not initialized. SMS will not be sent.")
         return False
 
-    if not TWILIO_PHONE_NUMBER:
-        print("TWILIO_PHONE_NUMBER not set. SMS will not be sent.")
+    if not from_number:
+        logger.warning("TWILIO_PHONE_NUMBER not set. SMS will not be sent.")
         return False
 
     # Validate phone number
     if not validate_phone_number(to_phone_number):
-        print(f"Invalid phone number format: {to_phone_number}")
+        logger.warning("Invalid phone number format", extra={"phone": mask_phone(to_phone_number)})
         return False
 
     # Check message length
     if len(message_body) > MAX_MESSAGE_LENGTH:
-        print(f"Message too long ({len(message_body)} chars). Max: {MAX_MESSAGE_LENGTH}")
+        logger.warning("Message too long (%d chars). Max: %d", len(message_body), MAX_MESSAGE_LENGTH)
         return False
 
     # Check rate limiting
     if not check_rate_limit(to_phone_number):
-        print(f"Rate limit exceeded for {to_phone_number} (max {MAX_MESSAGES_PER_HOUR}/hour)")
+        logger.warning("Rate limit exceeded (max %d/hour)", MAX_MESSAGES_PER_HOUR, extra={"phone": mask_phone(to_phone_number)})
         return False
 
     # Normalize phone number (ensure it starts with +1 for US numbers)
@@ -84,12 +90,12 @@ async def send_sms(to_phone_number: str, message_body: str):
     try:
         message = client.messages.create(
             to=normalized_phone,
-            from_=TWILIO_PHONE_NUMBER,
+            from_=from_number,
             body=message_body
         )
-        print(f"SMS sent to {normalized_phone}: {message.sid}")
+        logger.info("SMS sent", extra={"phone": mask_phone(normalized_phone), "sid": message.sid})
         record_message_sent(to_phone_number)  # Record for rate limiting
         return message.sid
     except Exception as e:
-        print(f"Error sending SMS to {normalized_phone}: {e}")
+        logger.error("Error sending SMS: %s", e, extra={"phone": mask_phone(normalized_phone)})
         return None
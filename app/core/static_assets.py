@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it only gzip variants are built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+# Served under a content-hashed name that never changes meaning, so browsers keep them for a year
+FINGERPRINTED_EXTENSIONS = (".js", ".css")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Pages and unhashed names: cached, but revalidated (a cheap 304) on every use
+REVALIDATE = "no-cache"
+MIN_COMPRESS_BYTES = 1024
+# Rebuild when a file changes, so editing app.js in development needs no restart
+AUTO_RELOAD = os.getenv(
+    "STATIC_AUTO_RELOAD", "false" if os.getenv("ENVIRONMENT") == "production" else "true"
+).lower() in ("1", "true", "yes")
+
+_STATIC_REFERENCE = re.compile(r'(href|src)="/static/([^"?#]+)(?:\?[^"#]*)?"')
+
+
+@dataclass
+class Asset:
+    body: bytes
+    media_type: str
+    etag: str
+    cache_control: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+
+def build_asset(body: bytes, filename: str, cache_control: str) -> Asset:
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    asset = Asset(body, media_type, hashlib.sha256(body).hexdigest()[:16], cache_control)
+    if len(body) >= MIN_COMPRESS_BYTES:
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        asset.gzip = compressed if len(compressed) < len(body) else None
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            asset.br = compressed if len(compressed) < len(body) else None
+    return asset
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    encodings = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+class StaticAssets:
+    """
+    The static directory, built once in memory: .js/.css get a content-hashed name
+    (app.3f2a1b9c04.js) served with Cache-Control: immutable, HTML pages are
+    rendered with those names, and everything big enough has gzip (and, with the
+    brotli package, br) variants ready to send. Mounted at /static.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR):
+        self.directory = directory
+        self.assets: Dict[str, Asset] = {}
+        self.manifest: Dict[str, str] = {}
+        self.mtimes: Dict[str, float] = {}
+        self.build()
+
+    def _scan(self) -> Dict[str, float]:
+        return {
+            entry.name: entry.stat().st_mtime
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.startswith(".")
+        }
+
+    def build(self) -> None:
+        mtimes = self._scan()
+        sources = {}
+        for name in mtimes:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                sources[name] = f.read()
+
+        assets, manifest = {}, {}
+        for name, body in sources.items():
+            if name.endswith(FINGERPRINTED_EXTENSIONS):
+                stem, ext = os.path.splitext(name)
+                hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+                manifest[name] = hashed
+                assets[hashed] = build_asset(body, name, IMMUTABLE)
+                # Pages cached before this build still ask for the plain name
+                assets[name] = build_asset(body, name, REVALIDATE)
+
+        for name, body in sources.items():
+            if name.endswith(".html"):
+                body = self.rewrite_references(body.decode("utf-8"), manifest).encode("utf-8")
+            if name not in assets:
+                assets[name] = build_asset(body, name, REVALIDATE)
+
+        self.assets, self.manifest, self.mtimes = assets, manifest, mtimes
+        logger.info("Static assets built", extra={"files": len(sources), "fingerprinted": len(manifest), "brotli": brotli is not None})
+
+    @staticmethod
+    def rewrite_references(html: str, manifest: Dict[str, str]) -> str:
+        """Point /static/... references at the hashed names (dropping ?v= cache busters)."""
+        def replace(match):
+            hashed = manifest.get(match.group(2))
+            return f'{match.group(1)}="/static/{hashed}"' if hashed else match.group(0)
+
+        return _STATIC_REFERENCE.sub(replace, html)
+
+    def response(self, name: str, headers: Headers) -> Response:
+        if AUTO_RELOAD and self._scan() != self.mtimes:
+            self.build()
+        asset = self.assets.get(name)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+
+        encodings = accepted_encodings(headers.get("accept-encoding", ""))
+        if asset.br is not None and "br" in encodings:
+            body, encoding = asset.br, "br"
+        elif asset.gzip is not None and "gzip" in encodings:
+            body, encoding = asset.gzip, "gzip"
+        else:
+            body, encoding = asset.body, None
+
+        # Each encoding is its own representation, so each gets its own validator
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        response_headers = {"Cache-Control": asset.cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+            return Response(status_code=304, headers=response_headers)
+        return Response(body, media_type=asset.media_type, headers=response_headers)
+
+    async def __call__(self, scope, receive, send):
+        # Mounted: root_path ends with the mount point, path is still the full path
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if path.startswith(root_path):
+            path = path[len(root_path):]
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response("Method Not Allowed", status_code=405, media_type="text/plain")
+        else:
+            response = self.response(path.lstrip("/"), Headers(scope=scope))
+        await response(scope, receive, send)
+
+
+static_assets = StaticAssets()
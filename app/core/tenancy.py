@@ -0,0 +1,98 @@
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+
+# Rows created before tenancy belonged to the only shop at the time
+DEFAULT_TENANT = "montebello"
+
+# Set per request by get_current_user (or from the Twilio number for webhooks).
+# Unset means system work (scheduler, migrations) that spans every shop.
+tenant_id_var: ContextVar[Optional[str]] = ContextVar("tenant_id", default=None)
+
+
+def current_tenant() -> str:
+    tenant_id = tenant_id_var.get()
+    if tenant_id is None:
+        raise RuntimeError("No tenant in context; pass tenant_id explicitly outside requests")
+    return tenant_id
+
+
+class TenantScoped:
+    """Marker for models whose rows belong to one shop; queries on them are filtered by scope_to_tenant."""
+
+
+@event.listens_for(Session, "do_orm_execute")
+def scope_to_tenant(execute_state: ORMExecuteState) -> None:
+    """
+    Add "tenant_id = <current tenant>" to every ORM SELECT/UPDATE/DELETE on a
+    TenantScoped model, including joins and relationship loads. Inserts, Core
+    statements on a raw connection and text() SQL are not covered and must set
+    or filter tenant_id themselves. execution_options(all_tenants=True) opts out.
+    """
+    tenant_id = tenant_id_var.get()
+    if (
+        tenant_id is None
+        or execute_state.is_column_load
+        or execute_state.is_relationship_load
+        or execute_state.is_insert
+        or execute_state.execution_options.get("all_tenants", False)
+    ):
+        return
+    execute_state.statement = execute_state.statement.options(*tenant_criteria(tenant_id))
+
+
+@lru_cache(maxsize=None)
+def tenant_criteria(tenant_id: str) -> tuple:
+    # One criteria per model (not per mixin): the models declare tenant_id, the mixin can't.
+    # Listed for every model so they also propagate to relationship loads. Built once
+    # per tenant; constructing them on every query roughly doubled simple query time.
+    return tuple(
+        with_loader_criteria(model, lambda cls: cls.tenant_id == tenant_id, include_aliases=True)
+        for model in TenantScoped.__subclasses__()
+    )
+
+
+@dataclass(frozen=True)
+class Shop:
+    name: str
+    # Closing line of reminder texts: name, address, hours, phone
+    signature: str
+    phone: str
+    # Twilio number the shop sends from and receives replies on
+    sms_number: Optional[str]
+
+
+def _shop(tenant_id: str, name: str, signature: str, phone: str) -> Shop:
+    prefix = tenant_id.upper()
+    return Shop(
+        name=os.getenv(f"SHOP_NAME_{prefix}", name),
+        signature=os.getenv(f"SHOP_SIGNATURE_{prefix}", signature),
+        phone=os.getenv(f"SHOP_PHONE_{prefix}", phone),
+        sms_number=os.getenv(f"TWILIO_PHONE_NUMBER_{prefix}") or os.getenv("TWILIO_PHONE_NUMBER"),
+    )
+
+
+SHOPS = {
+    "montebello": _shop(
+        "montebello", "Montebello Lube N' Tune",
+        "Montebello Lube N' Tune, 2130 W Beverly Blvd. Mon-Sat 8-5. (323) 727-2883.", "(323) 727-2883",
+    ),
+    "eastlube": _shop("eastlube", "East Lube", "East Lube.", ""),
+}
+
+
+def shop_for(tenant_id: str) -> Shop:
+    return SHOPS.get(tenant_id) or SHOPS[DEFAULT_TENANT]
+
+
+def tenant_for_number(sms_number: str) -> str:
+    """Shop that owns a Twilio number; shops sharing the default number resolve to DEFAULT_TENANT."""
+    for tenant_id in SHOPS:
+        if os.getenv(f"TWILIO_PHONE_NUMBER_{tenant_id.upper()}") == sms_number:
+            return tenant_id
+    return DEFAULT_TENANT
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.database import dialect_insert
+from app.core.http import get_http_client
+from app.core.vin_offline import validate_vin, decode_offline
+from app.models.vin_decode import VinDecode, VinPatternDecode
+
+logger = logging.getLogger(__name__)
+
+VPIC_BASE_URL = os.getenv("VPIC_BASE_URL", "https://vpic.nhtsa.dot.gov/api/vehicles")
+# How long a decode waits on vPIC before answering with the offline partial result
+VPIC_DEADLINE_SECONDS = float(os.getenv("VPIC_DEADLINE_SECONDS", "3"))
+# DecodeVINValuesBatch accepts at most 50 VINs per call
+VPIC_BATCH_SIZE = 50
+VPIC_BATCH_CONCURRENCY = int(os.getenv("VPIC_BATCH_CONCURRENCY", "4"))
+
+# Tier 1: per-worker memory. Tier 2: the vindecode / vinpatterndecode tables.
+decode_cache = LRUCache(maxsize=5000)
+pattern_cache = LRUCache(maxsize=2000)
+
+
+def vin_pattern(vin: str) -> str:
+    """First 11 characters with the check digit (position 9) masked. The WMI, vehicle
+    descriptor and model year in there fix make/model/year for most vehicles."""
+    return f"{vin[:8]}*{vin[9:11]}"
+
+
+def parse_vpic_results(vin: str, results: list) -> dict:
+    result = {
+        "vin": vin,
+        "make": None,
+        "model": None,
+        "year": None,
+        "trim": None
+    }
+
+    for item in results:
+        label = item.get("Variable")
+        value = item.get("Value")
+        if not value:
+            continue
+
+        if label == "Make":
+            result["make"] = value.upper()
+        elif label == "Model":
+            result["model"] = value.upper()
+        elif label == "Model Year":
+            result["year"] = int(value)
+        elif label == "Trim":
+            result["trim"] = value.upper()
+
+    return result
+
+
+async def fetch_from_vpic(vin: str) -> dict:
+    client = get_http_client()
+    try:
+        response = await client.get(f"{VPIC_BASE_URL}/DecodeVin/{vin}", params={"format": "json"})
+        data = response.json()
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="NHTSA API timeout - please try again later.")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"NHTSA API unavailable: {str(e)}")
+    except ValueError:
+        data = None
+
+    if not data or "Results" not in data:
+        raise HTTPException(status_code=500, detail="Failed to decode VIN.")
+
+    return parse_vpic_results(vin, data["Results"])
+
+
+def parse_vpic_values(row: dict) -> dict:
+    """Parse one row of the flat DecodeVINValues(Batch) format."""
+    year = row.get("ModelYear")
+    return {
+        "vin": (row.get("VIN") or "").upper(),
+        "make": (row.get("Make") or "").upper() or None,
+        "model": (row.get("Model") or "").upper() or None,
+        "year": int(year) if year else None,
+        "trim": (row.get("Trim") or "").upper() or None,
+    }
+
+
+async def fetch_batch_from_vpic(vins: List[str]) -> Dict[str, dict]:
+    client = get_http_client()
+    try:
+        response = await client.post(
+            f"{VPIC_BASE_URL}/DecodeVINValuesBatch/",
+            data={"format": "json", "data": ";".join(vins)},
+        )
+        data = response.json()
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="NHTSA API timeout - please try again later.")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"NHTSA API unavailable: {str(e)}")
+    except ValueError:
+        data = None
+
+    if not data or "Results" not in data:
+        raise HTTPException(status_code=500, detail="Failed to decode VINs.")
+
+    results = {}
+    for row in data["Results"]:
+        result = parse_vpic_values(row)
+        if result["vin"] in vins:
+            results[result["vin"]] = result
+    return results
+
+
+def is_complete(result: dict) -> bool:
+    return bool(result.get("make") and result.get("model") and result.get("year"))
+
+
+def from_pattern(vin: str, pattern: dict) -> dict:
+    return {"vin": vin, **pattern, "source": "pattern"}
+
+
+async def lookup_cached(vin: str, session: AsyncSession) -> Optional[dict]:
+    """Answer from memory or the database without touching the network. Exact VIN
+    hits win over pattern hits since trim can vary within a pattern."""
+    cached = decode_cache.get(vin)
+    if cached:
+        return {**cached, "source": "cache"}
+
+    stored = await session.get(VinDecode, vin)
+    result = stored and {"vin": vin, "make": stored.make, "model": stored.model, "year": stored.year, "trim": stored.trim}
+    # Incomplete rows (stored before only complete decodes were kept) count as misses
+    if result and is_complete(result):
+        decode_cache.set(vin, result)
+        return {**result, "source": "cache"}
+
+    pattern = vin_pattern(vin)
+    cached_pattern = pattern_cache.get(pattern)
+    if cached_pattern:
+        return from_pattern(vin, cached_pattern)
+
+    stored_pattern = await session.get(VinPatternDecode, pattern)
+    if stored_pattern:
+        fields = {"make": stored_pattern.make, "model": stored_pattern.model, "year": stored_pattern.year, "trim": stored_pattern.trim}
+        pattern_cache.set(pattern, fields)
+        return from_pattern(vin, fields)
+
+    return None
+
+
+async def lookup_cached_many(vins: List[str], session: AsyncSession) -> Dict[str, dict]:
+    """Same tiers as lookup_cached, but one query per table for the whole list."""
+    found = {}
+    for vin in vins:
+        cached = decode_cache.get(vin)
+        if cached:
+            found[vin] = {**cached, "source": "cache"}
+
+    missing = [vin for vin in vins if vin not in found]
+    if missing:
+        rows = await session.execute(select(VinDecode).where(VinDecode.vin.in_(missing)))
+        for stored in rows.scalars():
+            result = {"vin": stored.vin, "make": stored.make, "model": stored.model, "year": stored.year, "trim": stored.trim}
+            if not is_complete(result):
+                continue
+            decode_cache.set(stored.vin, result)
+            found[stored.vin] = {**result, "source": "cache"}
+
+    missing = [vin for vin in vins if vin not in found]
+    patterns = {}
+    for vin in missing:
+        cached_pattern = pattern_cache.get(vin_pattern(vin))
+        if cached_pattern:
+            found[vin] = from_pattern(vin, cached_pattern)
+        else:
+            patterns.setdefault(vin_pattern(vin), []).append(vin)
+
+    if patterns:
+        rows = await session.execute(select(VinPatternDecode).where(VinPatternDecode.pattern.in_(list(patterns))))
+        for stored in rows.scalars():
+            fields = {"make": stored.make, "model": stored.model, "year": stored.year, "trim": stored.trim}
+            pattern_cache.set(stored.pattern, fields)
+            for vin in patterns[stored.pattern]:
+                found[vin] = from_pattern(vin, fields)
+
+    return found
+
+
+async def store_decodes(session: AsyncSession, results: list) -> None:
+    """Write-through of fresh vPIC results to both tiers. Only complete decodes are kept,
+    so a partial answer is retried next time. A failed write only costs a future cache miss."""
+    now = datetime.utcnow()
+    results = [r for r in results if is_complete(r)]
+    rows = [{**{k: r[k] for k in ("vin", "make", "model", "year", "trim")}, "decoded_at": now} for r in results]
+    patterns = {}
+    for r in results:
+        decode_cache.set(r["vin"], {k: r[k] for k in ("vin", "make", "model", "year", "trim")})
+        fields = {k: r[k] for k in ("make", "model", "year", "trim")}
+        pattern_cache.set(vin_pattern(r["vin"]), fields)
+        patterns[vin_pattern(r["vin"])] = {"pattern": vin_pattern(r["vin"]), **fields, "decoded_at": now}
+    if not rows:
+        return
+
+    try:
+        stmt = dialect_insert(VinDecode.__table__)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["vin"],
+                set_={c: stmt.excluded[c] for c in ("make", "model", "year", "trim", "decoded_at")},
+            ),
+            rows,
+        )
+        stmt = dialect_insert(VinPatternDecode.__table__)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["pattern"],
+                set_={c: stmt.excluded[c] for c in ("make", "model", "year", "trim", "decoded_at")},
+            ),
+            list(patterns.values()),
+        )
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        logger.warning("Could not store VIN decode cache: %s", e)
+
+
+async def decode_vin(vin: str, session: AsyncSession) -> dict:
+    """Decode a 17-character VIN: validate locally, then memory, database and the vPIC API.
+    Falls back to the offline make/year decode when vPIC is slow or down."""
+    vin = vin.upper()
+    error = validate_vin(vin)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    cached = await lookup_cached(vin, session)
+    if cached:
+        return cached
+
+    try:
+        result = await asyncio.wait_for(fetch_from_vpic(vin), timeout=VPIC_DEADLINE_SECONDS)
+    except (asyncio.TimeoutError, HTTPException) as e:
+        logger.warning("vPIC decode failed for %s, using offline decode: %s", vin, getattr(e, "detail", "timeout"))
+        # Partial results are not cached so the next request retries vPIC
+        return {**decode_offline(vin), "source": "offline"}
+
+    await store_decodes(session, [result])
+    return {**result, "source": "nhtsa"}
+
+
+async def decode_vins(vins: List[str], session: AsyncSession) -> List[dict]:
+    """Decode many VINs: invalid ones are reported, cached ones answered locally, and the
+    rest sent to vPIC in batches of VPIC_BATCH_SIZE with bounded concurrency. A failed
+    batch degrades its VINs to the offline decode instead of failing the request."""
+    vins = list(dict.fromkeys(vin.strip().upper() for vin in vins if vin and vin.strip()))
+    results: Dict[str, dict] = {}
+
+    valid = []
+    for vin in vins:
+        error = validate_vin(vin)
+        if error:
+            results[vin] = {"vin": vin, "make": None, "model": None, "year": None, "trim": None, "source": None, "error": error}
+        else:
+            valid.append(vin)
+
+    for vin, result in (await lookup_cached_many(valid, session)).items():
+        results[vin] = {**result, "error": None}
+
+    pending = [vin for vin in valid if vin not in results]
+    semaphore = asyncio.Semaphore(VPIC_BATCH_CONCURRENCY)
+
+    async def run_batch(batch: List[str]):
+        async with semaphore:
+            try:
+                return batch, await fetch_batch_from_vpic(batch), None
+            except HTTPException as e:
+                return batch, {}, e.detail
+
+    batches = [pending[i:i + VPIC_BATCH_SIZE] for i in range(0, len(pending), VPIC_BATCH_SIZE)]
+    fresh = []
+    for batch, decoded, error in await asyncio.gather(*(run_batch(batch) for batch in batches)):
+        if error:
+            logger.warning("vPIC batch decode failed for %d VINs, using offline decode: %s", len(batch), error)
+        for vin in batch:
+            if vin in decoded:
+                fresh.append(decoded[vin])
+                results[vin] = {**decoded[vin], "source": "nhtsa", "error": None}
+            else:
+                results[vin] = {**decode_offline(vin), "source": "offline", "error": error or "Not returned by vPIC."}
+
+    if fresh:
+        await store_decodes(session, fresh)
+    return [results[vin] for vin in vins]
@@ -0,0 +1,91 @@
+from typing import Optional
+
+# ISO 3779 / 49 CFR 565 check digit tables
+VIN_ALPHABET = set("ABCDEFGHJKLMNPRSTUVWXYZ0123456789")
+TRANSLITERATION = {
+    **{str(d): d for d in range(10)},
+    "A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6, "G": 7, "H": 8,
+    "J": 1, "K": 2, "L": 3, "M": 4, "N": 5, "P": 7, "R": 9,
+    "S": 2, "T": 3, "U": 4, "V": 5, "W": 6, "X": 7, "Y": 8, "Z": 9,
+}
+POSITION_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+# Position 10 cycles every 30 years: 1980-2009 and 2010-2039 share codes
+MODEL_YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+
+# Regions that require the check digit; elsewhere position 9 may be a plain character
+CHECK_DIGIT_REGIONS = set("12345")
+
+# World Manufacturer Identifiers (first 3 characters) for makes we commonly service.
+# Not exhaustive; unknown WMIs just decode without a make.
+WMI_MAKES = {
+    "1FA": "FORD", "1FB": "FORD", "1FC": "FORD", "1FD": "FORD", "1FM": "FORD", "1FT": "FORD",
+    "1FU": "FREIGHTLINER", "1FV": "FREIGHTLINER", "2FA": "FORD", "2FM": "FORD", "2FT": "FORD",
+    "3FA": "FORD", "3FT": "FORD", "1LN": "LINCOLN", "2LM": "LINCOLN", "5LM": "LINCOLN",
+    "1G1": "CHEVROLET", "1GC": "CHEVROLET", "1GN": "CHEVROLET", "1GB": "CHEVROLET",
+    "2G1": "CHEVROLET", "3G1": "CHEVROLET", "3GC": "CHEVROLET", "3GN": "CHEVROLET", "KL7": "CHEVROLET",
+    "1GT": "GMC", "1GK": "GMC", "2GT": "GMC", "3GT": "GMC", "1GY": "CADILLAC", "1G6": "CADILLAC",
+    "2G4": "BUICK", "1G4": "BUICK", "KL4": "BUICK", "5GA": "BUICK",
+    "1C3": "CHRYSLER", "2C3": "CHRYSLER", "2C4": "CHRYSLER", "1C4": "JEEP", "1J4": "JEEP", "1J8": "JEEP",
+    "1C6": "RAM", "3C6": "RAM", "3C7": "RAM", "1D7": "DODGE", "1B3": "DODGE", "2B3": "DODGE",
+    "1HG": "HONDA", "2HG": "HONDA", "5FN": "HONDA", "5J6": "HONDA", "JHM": "HONDA", "SHH": "HONDA",
+    "19U": "ACURA", "JH4": "ACURA", "5J8": "ACURA",
+    "4T1": "TOYOTA", "4T3": "TOYOTA", "4T4": "TOYOTA", "5TD": "TOYOTA", "5TF": "TOYOTA", "2T1": "TOYOTA",
+    "2T3": "TOYOTA", "JTD": "TOYOTA", "JTE": "TOYOTA", "JTM": "TOYOTA", "JTN": "TOYOTA", "JTK": "TOYOTA",
+    "JT2": "TOYOTA", "JTH": "LEXUS", "2T2": "LEXUS", "58A": "LEXUS", "JTJ": "LEXUS",
+    "1N4": "NISSAN", "1N6": "NISSAN", "3N1": "NISSAN", "3N6": "NISSAN", "5N1": "NISSAN", "JN1": "NISSAN",
+    "JN8": "NISSAN", "JNK": "INFINITI", "5N3": "INFINITI",
+    "KMH": "HYUNDAI", "5NP": "HYUNDAI", "5NM": "HYUNDAI", "KM8": "HYUNDAI",
+    "KNA": "KIA", "KND": "KIA", "5XX": "KIA", "5XY": "KIA", "KMU": "GENESIS",
+    "JM1": "MAZDA", "JM3": "MAZDA", "3MZ": "MAZDA", "3MV": "MAZDA",
+    "JF1": "SUBARU", "JF2": "SUBARU", "4S3": "SUBARU", "4S4": "SUBARU",
+    "JA3": "MITSUBISHI", "JA4": "MITSUBISHI", "ML3": "MITSUBISHI",
+    "WBA": "BMW", "WBS": "BMW", "WBX": "BMW", "5UX": "BMW", "5YM": "BMW", "WMW": "MINI",
+    "WDB": "MERCEDES-BENZ", "WDD": "MERCEDES-BENZ", "WDC": "MERCEDES-BENZ", "W1K": "MERCEDES-BENZ",
+    "W1N": "MERCEDES-BENZ", "4JG": "MERCEDES-BENZ", "55S": "MERCEDES-BENZ",
+    "WAU": "AUDI", "WA1": "AUDI", "WUA": "AUDI", "WVW": "VOLKSWAGEN", "WVG": "VOLKSWAGEN",
+    "3VW": "VOLKSWAGEN", "1VW": "VOLKSWAGEN", "WP0": "PORSCHE", "WP1": "PORSCHE",
+    "YV1": "VOLVO", "YV4": "VOLVO", "7JR": "VOLVO", "SAL": "LAND ROVER", "SAJ": "JAGUAR",
+    "5YJ": "TESLA", "7SA": "TESLA", "LRW": "TESLA", "7FC": "RIVIAN", "ZFA": "FIAT", "3C3": "FIAT",
+    "ZAR": "ALFA ROMEO", "ZFF": "FERRARI",
+}
+
+
+def check_digit(vin: str) -> str:
+    total = sum(TRANSLITERATION[ch] * weight for ch, weight in zip(vin, POSITION_WEIGHTS))
+    remainder = total % 11
+    return "X" if remainder == 10 else str(remainder)
+
+
+def validate_vin(vin: str) -> Optional[str]:
+    """Returns an error message for a malformed VIN, or None if it looks valid."""
+    if len(vin) != 17:
+        return "VIN must be 17 characters long."
+    invalid = sorted(set(vin) - VIN_ALPHABET)
+    if invalid:
+        return f"VIN contains invalid characters: {', '.join(invalid)} (I, O and Q are never used)."
+    if vin[0] in CHECK_DIGIT_REGIONS and vin[8] != check_digit(vin):
+        return "VIN check digit does not match - please re-check the VIN."
+    return None
+
+
+def decode_model_year(vin: str) -> Optional[int]:
+    code = vin[9]
+    if code not in MODEL_YEAR_CODES:
+        return None
+    year = 1980 + MODEL_YEAR_CODES.index(code)
+    # North American light vehicles use a letter in position 7 from 2010 on
+    if vin[6].isalpha():
+        year += 30
+    return year
+
+
+def decode_offline(vin: str) -> dict:
+    """Partial decode from the VIN itself: manufacturer and model year only."""
+    return {
+        "vin": vin,
+        "make": WMI_MAKES.get(vin[:3]),
+        "model": None,
+        "year": decode_model_year(vin),
+        "trim": None,
+    }
@@ -1,9 +1,7 @@
+import logging
 from fastapi import FastAPI, Request, Depends, HTTPException, APIRouter
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.exceptions import HTTPException
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-import secrets
-import os
 
 from app.routes.vin import create_new_vin as vin_create
 from app.routes.vin import get_vin_profile as vin_read
@@ -14,39 +12,51 @@ from app.routes.contact import contact as contact_routes
 from app.routes.message import send_message as message_routes
 from app.routes.message import inbound as inbound_routes
 from app.routes.message import cost_tracking as cost_routes
-from app.core.database import init_db
+from app.routes.bulk_import import bulk_import as import_routes
+from app.routes.system import cache as cache_routes
+from app.routes.system import metrics as metrics_routes
+from app.routes.system import profiler as profiler_routes
+from app.core.database import engine, init_db, ping_database, ReadYourWritesMiddleware
 from app.core.scheduler import start_scheduler
-from app.core.security import get_current_username # Keep this import for now, will adjust later
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from app.core.http import close_http_client
+from app.core.read_cache import read_cache
+from app.core.logging_config import setup_logging, RequestIdMiddleware
+from app.core.query_profiler import QueryProfilerMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.profiler import ProfilerMiddleware
+from app.core.security import get_current_user
+from app.core.static_assets import static_assets
+from app.core.responses import FastJSONResponse, StreamingSafeGZipMiddleware, GZIP_MIN_BYTES, GZIP_LEVEL
 import asyncio
 
-app = FastAPI()
+setup_logging()
+logger = logging.getLogger(__name__)
 
-# Health check endpoint for uptime monitoring
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(ProfilerMiddleware, router=app.router)
+app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(RequestIdMiddleware)
+# Skips responses that already carry Content-Encoding (the precompressed static assets) and streamed ones (import progress)
+app.add_middleware(StreamingSafeGZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+app.add_middleware(MetricsMiddleware)
+
+# Health check endpoint for uptime monitoring; fails when the database is unreachable
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
-
-# Templates for serving HTML
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "static"))
-
-# --- Multi-tenant Basic Auth Logic ---
-TENANT_CREDENTIALS = {
-    "montebello": os.getenv("SHOP_PASSWORD_MONTEBELLO", "mblnt25"),
-    "eastlube": os.getenv("SHOP_PASSWORD_EASTLUBE", "eastlube456")
-}
-
-def get_current_user(credentials: HTTPBasicCredentials = Depends(HTTPBasic())):
-    correct_password = TENANT_CREDENTIALS.get(credentials.username)
-    if not correct_password or not secrets.compare_digest(credentials.password.encode('utf-8'), correct_password.encode('utf-8')):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    return credentials.username
+    try:
+        latency = await ping_database(engine)
+    except Exception as e:
+        logger.error("Health check: database unreachable: %s", e)
+        return JSONResponse(status_code=503, content={"status": "error", "database": "unreachable"})
+    return {"status": "ok", "database_latency_ms": round(latency * 1000, 1)}
 
 # --- Routing ---
 
 # Unprotected webhook for Twilio
 app.include_router(inbound_routes.router, tags=["Messages"])
+# Prometheus scrape endpoint (optionally METRICS_TOKEN-protected)
+app.include_router(metrics_routes.router, tags=["System"])
 
 # Protected API routes
 protected_router = APIRouter(dependencies=[Depends(get_current_user)])
@@ -58,6 +68,9 @@ protected_router.include_router(decode_vin_nhtsa.router, prefix="/vin", tags=["V
 protected_router.include_router(contact_routes.router, prefix="/contacts", tags=["Contacts"])
 protected_router.include_router(message_routes.router, prefix="/messages", tags=["Messages"])
 protected_router.include_router(cost_routes.router, prefix="/messages", tags=["Costs"])
+protected_router.include_router(import_routes.router, prefix="/import", tags=["Import"])
+protected_router.include_router(cache_routes.router, prefix="/cache", tags=["Cache"])
+protected_router.include_router(profiler_routes.router, prefix="/profiler", tags=["Profiler"])
 
 @protected_router.get("/vin/test-auth")
 async def test_auth():
@@ -70,34 +83,34 @@ async def protected_test():
 # Include the protected router into the main app
 app.include_router(protected_router)
 
-import os
-
 # Publicly accessible login page
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    return FileResponse(os.path.join(os.path.dirname(__file__), "static", "login.html"))
+async def root(request: Request):
+    return static_assets.response("login.html", request.headers)
 
 
 
-# Main application page (authentication handled by JavaScript)
+# Main application page (authentication handled by JavaScript), rendered once with fingerprinted asset URLs
 @app.get("/app", response_class=HTMLResponse)
 async def main_app(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return static_assets.response("index.html", request.headers)
 
-# Publicly accessible static files (for login.html and its JS/CSS)
-app.mount(
-    "/static", 
-    StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), 
-    name="static"
-)
+# Publicly accessible static files (for login.html and its JS/CSS), precompressed and fingerprinted
+app.mount("/static", static_assets, name="static")
 
 # --- Startup/Shutdown Events ---
 @app.on_event("startup")
 async def on_startup():
-    print("Running DB init...")
+    logger.info("Running DB init...")
     await init_db()
-    print("DB init done")
+    logger.info("DB init done")
     asyncio.create_task(start_scheduler()) # Start the background scheduler
+    await read_cache.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await close_http_client()
+    await read_cache.stop()
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -1,16 +1,25 @@
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
+from app.core.tenancy import TenantScoped, current_tenant
 
 if TYPE_CHECKING:
     from app.models.vin_contact_link import VINContactLink
     from app.models.scheduled_message import ScheduledMessage
     from app.models.incoming_message import IncomingMessage
 
-class Contact(SQLModel, table=True):
+class Contact(SQLModel, TenantScoped, table=True):
+    # Phone and email identify a customer within a shop
+    __table_args__ = (
+        Index("ix_contact_tenant_phone_number", "tenant_id", "phone_number", unique=True),
+        Index("ix_contact_tenant_email", "tenant_id", "email", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: str = Field(default_factory=current_tenant, max_length=32)
     name: str
-    phone_number: str = Field(unique=True, index=True)
-    email: Optional[str] = Field(default=None, unique=True, index=True)
+    phone_number: str
+    email: Optional[str] = None
 
     # Relationships
     vin_links: List["VINContactLink"] = Relationship(back_populates="contact")
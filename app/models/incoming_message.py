@@ -2,12 +2,14 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 from sqlmodel import Field, Relationship, SQLModel
+from app.core.tenancy import TenantScoped, current_tenant
 
 if TYPE_CHECKING:
     from .contact import Contact
 
-class IncomingMessage(SQLModel, table=True):
+class IncomingMessage(SQLModel, TenantScoped, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: str = Field(default_factory=current_tenant, max_length=32)
     from_number: str = Field(index=True)
     to_number: str
     body: str
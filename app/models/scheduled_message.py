@@ -1,11 +1,13 @@
 from typing import Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
+from app.core.tenancy import TenantScoped, current_tenant
 
-class ScheduledMessage(SQLModel, table=True):
+class ScheduledMessage(SQLModel, TenantScoped, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    tenant_id: str = Field(default_factory=current_tenant, max_length=32)
     contact_id: int = Field(foreign_key="contact.id")
-    vin_id: int = Field(foreign_key="vin.id")
+    vin_id: int = Field(foreign_key="vin.id", index=True)
     service_record_id: Optional[int] = Field(default=None, foreign_key="servicerecord.id", index=True)
     message_content: str
     scheduled_time: datetime
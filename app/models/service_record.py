@@ -1,10 +1,12 @@
 from typing import Optional
 from datetime import date
 from sqlmodel import SQLModel, Field, Relationship
+from app.core.tenancy import TenantScoped, current_tenant
 
-class ServiceRecord(SQLModel, table=True):
+class ServiceRecord(SQLModel, TenantScoped, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    vin_id: int = Field(foreign_key="vin.id")
+    tenant_id: str = Field(default_factory=current_tenant, max_length=32)
+    vin_id: int = Field(foreign_key="vin.id", index=True)
     service_date: date = Field(default_factory=date.today)
     oil_type: str
     oil_viscosity: str
@@ -1,15 +1,31 @@
 from typing import Optional, List
+from sqlalchemy import Column, Computed, Index, String
 from sqlmodel import SQLModel, Field, Relationship
+from app.core.tenancy import TenantScoped, current_tenant
+
+class VIN(SQLModel, TenantScoped, table=True):
+    # A VIN is unique within a shop; two shops may service the same car
+    __table_args__ = (Index("ix_vin_tenant_vin", "tenant_id", "vin", unique=True),)
 
-class VIN(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    vin: str = Field(index=True, unique=True, max_length=17)
+    tenant_id: str = Field(default_factory=current_tenant, max_length=32)
+    vin: str = Field(max_length=17)
     make: str
     model: str
     year: int
     trim: Optional[str] = None
     plate: Optional[str] = None
 
+    # Maintained by Postgres so partial-VIN and plate lookups can use btree indexes:
+    # "ends with" on vin becomes a prefix match on vin_reversed.
+    vin_reversed: Optional[str] = Field(
+        default=None, sa_column=Column(String, Computed("reverse(vin)", persisted=True))
+    )
+    plate_normalized: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String, Computed("upper(regexp_replace(plate, '[^A-Za-z0-9]', '', 'g'))", persisted=True)),
+    )
+
     service_records: List["ServiceRecord"] = Relationship(back_populates="vin")
     scheduled_messages: List["ScheduledMessage"] = Relationship(back_populates="vin")
 
@@ -1,9 +1,11 @@
 from typing import Optional
 from sqlmodel import SQLModel, Field, Relationship
+from app.core.tenancy import TenantScoped, current_tenant
 
-class VINContactLink(SQLModel, table=True):
+class VINContactLink(SQLModel, TenantScoped, table=True):
     vin_id: Optional[int] = Field(default=None, foreign_key="vin.id", primary_key=True)
     contact_id: Optional[int] = Field(default=None, foreign_key="contact.id", primary_key=True)
+    tenant_id: str = Field(default_factory=current_tenant, max_length=32)
 
     vin: "VIN" = Relationship(back_populates="contact_links")
     contact: "Contact" = Relationship(back_populates="vin_links")
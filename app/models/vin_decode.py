@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class VinDecode(SQLModel, table=True):
+    """vPIC decode result for a full VIN"""
+    vin: str = Field(primary_key=True, max_length=17)
+    make: Optional[str] = None
+    model: Optional[str] = None
+    year: Optional[int] = None
+    trim: Optional[str] = None
+    decoded_at: datetime = Field(default_factory=datetime.utcnow)
+
+class VinPatternDecode(SQLModel, table=True):
+    """Make/model/year shared by every VIN with the same first 11 characters (check digit masked)"""
+    pattern: str = Field(primary_key=True, max_length=11)
+    make: str
+    model: str
+    year: int
+    trim: Optional[str] = None
+    decoded_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,451 @@
+import csv
+import io
+import json
+import logging
+import tempfile
+from datetime import date, datetime
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import DIALECT, async_session, dialect_insert
+from app.core.read_cache import read_cache
+from app.core.reminders import build_reminder_message, reminder_send_time
+from app.core.tenancy import current_tenant, shop_for
+from app.models.contact import Contact
+from app.models.scheduled_message import ScheduledMessage
+from app.models.service_record import ServiceRecord
+from app.models.vin import VIN
+from app.models.vin_contact_link import VINContactLink
+from app.routes.contact.contact import normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+IMPORT_BATCH_SIZE = 2000
+# Column order for the COPY loads of plain (non-upsert) inserts
+SERVICE_RECORD_COLUMNS = (
+    "tenant_id", "vin_id", "service_date", "oil_type", "oil_viscosity", "mileage_at_service",
+    "next_service_mileage_due", "next_service_date_due", "notes",
+)
+REMINDER_COLUMNS = (
+    "tenant_id", "contact_id", "vin_id", "service_record_id", "message_content",
+    "scheduled_time", "created_at", "status", "is_reminder",
+)
+MAX_REPORTED_ERRORS = 100
+# Uploads larger than this are spooled to a temp file instead of memory
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# One row per vehicle/owner/service event. Owner and service columns are optional:
+#   vin, make, model, year, trim, plate,
+#   contact_name, phone_number, email,
+#   service_date, oil_type, oil_viscosity, mileage_at_service,
+#   next_service_mileage_due, next_service_date_due, notes
+
+
+def read_rows(binary_file: BinaryIO, fmt: str) -> Iterator[Optional[dict]]:
+    """Yield raw rows from a CSV or NDJSON file without loading it into memory.
+    Unparseable NDJSON lines are yielded as None so they are counted as invalid."""
+    text_file = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(text_file)
+        return
+    for line in text_file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _required(raw: dict, field: str) -> str:
+    value = _clean(raw.get(field))
+    if value is None:
+        raise ValueError(f"Missing {field}")
+    return value
+
+
+def parse_row(raw: Optional[dict]):
+    """Split one import row into (vehicle, contact, service) dicts; contact and service may be None."""
+    if not isinstance(raw, dict):
+        raise ValueError("Row is not a JSON object")
+
+    vin = _required(raw, "vin").upper()
+    if len(vin) != 17:
+        raise ValueError("VIN must be 17 characters long.")
+    vehicle = {
+        "vin": vin,
+        "make": _required(raw, "make").upper(),
+        "model": _required(raw, "model").upper(),
+        "year": int(_required(raw, "year")),
+        "trim": _clean(raw.get("trim")),
+        "plate": _clean(raw.get("plate")),
+    }
+
+    contact = None
+    phone = _clean(raw.get("phone_number"))
+    if phone:
+        normalized_phone = normalize_phone_number(phone)
+        if len(normalized_phone) != 10:
+            raise ValueError(f"Invalid phone number: {phone}")
+        contact = {
+            "name": _clean(raw.get("contact_name")) or _clean(raw.get("name")) or "Unknown",
+            "phone_number": normalized_phone,
+            "email": _clean(raw.get("email")),
+        }
+
+    service = None
+    if _clean(raw.get("service_date")) or _clean(raw.get("mileage_at_service")):
+        service = {
+            "service_date": date.fromisoformat(_required(raw, "service_date")),
+            "oil_type": _required(raw, "oil_type"),
+            "oil_viscosity": _required(raw, "oil_viscosity"),
+            "mileage_at_service": int(_required(raw, "mileage_at_service")),
+            "next_service_mileage_due": int(_required(raw, "next_service_mileage_due")),
+            "next_service_date_due": date.fromisoformat(_required(raw, "next_service_date_due")),
+            "notes": _clean(raw.get("notes")),
+        }
+
+    return vehicle, contact, service
+
+
+class BulkImporter:
+    """
+    Loads import rows in batches of multi-row upserts. Everything already written
+    is remembered in memory, so repeated vehicles/owners in the file cost nothing
+    and re-running the same file does not duplicate service records or reminders.
+    Rows go to tenant_id (default: the current request's shop).
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        generate_reminders: bool = False,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        tenant_id: Optional[str] = None,
+    ):
+        self.session = session
+        self.tenant_id = tenant_id or current_tenant()
+        self.generate_reminders = generate_reminders
+        self.batch_size = batch_size
+
+        self.vin_ids: dict[str, int] = {}
+        self.vehicles: dict[str, dict] = {}
+        self.contact_ids: dict[str, int] = {}
+        self.contact_names: dict[str, str] = {}
+        self.email_owners: dict[str, str] = {}
+        self.links: set[tuple[int, int]] = set()
+        self.owners: dict[str, set[str]] = {}
+        self.services: set[tuple[str, date, int]] = set()
+
+        self.stats = {
+            "rows": 0,
+            "invalid_rows": 0,
+            "vins": 0,
+            "contacts": 0,
+            "links": 0,
+            "service_records": 0,
+            "reminders": 0,
+            "errors": [],
+        }
+
+    def progress(self, stage: str) -> dict:
+        return {"stage": stage, **self.stats}
+
+    async def run(self, rows: Iterable[Optional[dict]]) -> AsyncIterator[dict]:
+        """Import all rows, yielding a progress snapshot after every committed batch."""
+        batch = []
+        for row_number, raw in enumerate(rows, start=1):
+            self.stats["rows"] += 1
+            try:
+                batch.append(parse_row(raw))
+            except (ValueError, TypeError) as e:
+                self.stats["invalid_rows"] += 1
+                if len(self.stats["errors"]) < MAX_REPORTED_ERRORS:
+                    self.stats["errors"].append({"row": row_number, "error": str(e)})
+                continue
+
+            if len(batch) >= self.batch_size:
+                await self.flush(batch)
+                batch = []
+                yield self.progress("importing")
+
+        if batch:
+            await self.flush(batch)
+        yield self.progress("imported")
+
+        if self.generate_reminders:
+            async for progress in self.schedule_reminders():
+                yield progress
+
+    async def flush(self, batch: list) -> None:
+        await self._upsert_vins(batch)
+        await self._upsert_contacts(batch)
+        await self._insert_links(batch)
+        await self._insert_service_records(batch)
+        await self.session.commit()
+        # Any of this shop's cached vehicles may have changed; also reaches app workers when run from import_data.py
+        await read_cache.clear(self.tenant_id)
+
+    async def _upsert_vins(self, batch: list) -> None:
+        new_vehicles = {}
+        for vehicle, _, _ in batch:
+            if vehicle["vin"] not in self.vin_ids:
+                new_vehicles.setdefault(vehicle["vin"], vehicle)
+        if not new_vehicles:
+            return
+
+        # Core (table-level) upserts: executemany without per-row ORM bookkeeping.
+        # Existing VINs keep their data; only missing trim/plate are filled in.
+        stmt = dialect_insert(VIN.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VIN.tenant_id, VIN.vin],
+            set_={
+                "trim": func.coalesce(VIN.trim, stmt.excluded.trim),
+                "plate": func.coalesce(VIN.plate, stmt.excluded.plate),
+            },
+        ).returning(VIN.id, VIN.vin)
+        result = await self.session.execute(
+            stmt, [{**vehicle, "tenant_id": self.tenant_id} for vehicle in new_vehicles.values()]
+        )
+        for vin_id, vin in result.all():
+            self.vin_ids[vin] = vin_id
+        self.vehicles.update(new_vehicles)
+        self.stats["vins"] += len(new_vehicles)
+
+    async def _upsert_contacts(self, batch: list) -> None:
+        new_contacts = {}
+        for _, contact, _ in batch:
+            if contact and contact["phone_number"] not in self.contact_ids:
+                new_contacts.setdefault(contact["phone_number"], dict(contact))
+        if not new_contacts:
+            return
+
+        # Emails are unique too: drop an email that already belongs to another phone
+        emails = {c["email"] for c in new_contacts.values() if c["email"]}
+        if emails:
+            taken = await self.session.execute(
+                select(Contact.email, Contact.phone_number).where(Contact.email.in_(emails))
+            )
+            for email, phone in taken.all():
+                self.email_owners.setdefault(email, phone)
+        for contact in new_contacts.values():
+            email = contact["email"]
+            if email and self.email_owners.setdefault(email, contact["phone_number"]) != contact["phone_number"]:
+                contact["email"] = None
+
+        # Same semantics as create_contact: re-adding a phone refreshes name/email
+        stmt = dialect_insert(Contact.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Contact.tenant_id, Contact.phone_number],
+            set_={
+                "name": stmt.excluded.name,
+                "email": func.coalesce(stmt.excluded.email, Contact.email),
+            },
+        ).returning(Contact.id, Contact.phone_number)
+        result = await self.session.execute(
+            stmt, [{**contact, "tenant_id": self.tenant_id} for contact in new_contacts.values()]
+        )
+        for contact_id, phone in result.all():
+            self.contact_ids[phone] = contact_id
+        for phone, contact in new_contacts.items():
+            self.contact_names[phone] = contact["name"]
+        self.stats["contacts"] += len(new_contacts)
+
+    async def _insert_links(self, batch: list) -> None:
+        new_links = set()
+        for vehicle, contact, _ in batch:
+            if not contact:
+                continue
+            self.owners.setdefault(vehicle["vin"], set()).add(contact["phone_number"])
+            key = (self.vin_ids[vehicle["vin"]], self.contact_ids[contact["phone_number"]])
+            if key not in self.links:
+                new_links.add(key)
+        if not new_links:
+            return
+
+        result = await self.session.execute(
+            dialect_insert(VINContactLink.__table__)
+            .on_conflict_do_nothing(index_elements=[VINContactLink.vin_id, VINContactLink.contact_id])
+            .returning(VINContactLink.vin_id),
+            [{"vin_id": vin_id, "contact_id": contact_id, "tenant_id": self.tenant_id} for vin_id, contact_id in new_links],
+        )
+        self.links.update(new_links)
+        self.stats["links"] += len(result.all())
+
+    async def _copy_rows(self, model, columns: tuple, rows: list) -> None:
+        """Load plain inserts with COPY through the session's asyncpg connection."""
+        if DIALECT == "sqlite":
+            # No COPY; a Core executemany is SQLite's bulk path
+            await self.session.execute(insert(model.__table__), [dict(zip(columns, row)) for row in rows])
+            return
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            model.__tablename__, records=rows, columns=columns
+        )
+
+    async def _insert_service_records(self, batch: list) -> None:
+        candidates = {}
+        for vehicle, _, service in batch:
+            if not service:
+                continue
+            key = (vehicle["vin"], service["service_date"], service["mileage_at_service"])
+            if key not in self.services:
+                self.services.add(key)
+                candidates[key] = {**service, "vin_id": self.vin_ids[vehicle["vin"]], "tenant_id": self.tenant_id}
+        if not candidates:
+            return
+
+        # Skip services that are already on file so re-imports stay idempotent
+        vin_ids = {record["vin_id"] for record in candidates.values()}
+        existing = await self.session.execute(
+            select(ServiceRecord.vin_id, ServiceRecord.service_date, ServiceRecord.mileage_at_service)
+            .where(ServiceRecord.vin_id.in_(vin_ids))
+        )
+        existing_keys = {tuple(row) for row in existing.all()}
+        records = [
+            tuple(record[column] for column in SERVICE_RECORD_COLUMNS)
+            for record in candidates.values()
+            if (record["vin_id"], record["service_date"], record["mileage_at_service"]) not in existing_keys
+        ]
+        if records:
+            await self._copy_rows(ServiceRecord, SERVICE_RECORD_COLUMNS, records)
+            self.stats["service_records"] += len(records)
+
+    async def _latest_records(self, vin_ids: list) -> list:
+        """Most recent service record of each VIN."""
+        newest_first = (ServiceRecord.service_date.desc(), ServiceRecord.id.desc())
+        if DIALECT == "sqlite":
+            # No DISTINCT ON; rank within each VIN instead
+            ranked = (
+                select(ServiceRecord.id, func.row_number().over(partition_by=ServiceRecord.vin_id, order_by=newest_first).label("rank"))
+                .where(ServiceRecord.vin_id.in_(vin_ids))
+                .subquery()
+            )
+            query = select(ServiceRecord).join(ranked, ranked.c.id == ServiceRecord.id).where(ranked.c.rank == 1)
+        else:
+            query = (
+                select(ServiceRecord)
+                .where(ServiceRecord.vin_id.in_(vin_ids))
+                .distinct(ServiceRecord.vin_id)
+                .order_by(ServiceRecord.vin_id, *newest_first)
+            )
+        return (await self.session.execute(query)).scalars().all()
+
+    async def schedule_reminders(self) -> AsyncIterator[dict]:
+        """Schedule the upcoming due-date reminder for every imported vehicle whose
+        latest service on file comes from this import and that has no pending reminder."""
+        now = datetime.utcnow()
+        vins_by_id = {self.vin_ids[vin]: vin for vin in self.owners}
+        signature = shop_for(self.tenant_id).signature
+        owned_vin_ids = list(vins_by_id)
+
+        for start in range(0, len(owned_vin_ids), self.batch_size):
+            vin_ids = owned_vin_ids[start:start + self.batch_size]
+
+            latest_records = await self._latest_records(vin_ids)
+            already_pending = set((await self.session.execute(
+                select(ScheduledMessage.vin_id).distinct().where(
+                    ScheduledMessage.vin_id.in_(vin_ids),
+                    ScheduledMessage.status == "pending",
+                    ScheduledMessage.is_reminder == True,
+                )
+            )).scalars().all())
+
+            messages = []
+            for record in latest_records:
+                vin = vins_by_id[record.vin_id]
+                send_time = reminder_send_time(record.next_service_date_due)
+                if (
+                    record.vin_id in already_pending
+                    or send_time <= now
+                    or (vin, record.service_date, record.mileage_at_service) not in self.services
+                ):
+                    continue
+                vehicle = self.vehicles[vin]
+                for phone in sorted(self.owners[vin]):
+                    message_content = build_reminder_message(
+                        self.contact_names[phone],
+                        vehicle["make"],
+                        vehicle["model"],
+                        record.next_service_mileage_due,
+                        record.next_service_date_due,
+                        signature,
+                    )
+                    messages.append((
+                        self.tenant_id, self.contact_ids[phone], record.vin_id, record.id,
+                        message_content, send_time, now, "pending", True,
+                    ))
+
+            if messages:
+                await self._copy_rows(ScheduledMessage, REMINDER_COLUMNS, messages)
+                await self.session.commit()
+                self.stats["reminders"] += len(messages)
+            yield self.progress("scheduling_reminders")
+
+        yield self.progress("done")
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    if content_type and ("ndjson" in content_type or "jsonl" in content_type or "json" in content_type):
+        return "ndjson"
+    return "csv"
+
+
+@router.post("/")
+async def bulk_import(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    generate_reminders: bool = False,
+):
+    """
+    Bulk-import historical vehicles, owners and service records.
+
+    Send the file as the raw request body (CSV with a header row, or NDJSON),
+    e.g. `curl --data-binary @customers.csv -H "Content-Type: text/csv"`.
+    The response streams one JSON progress line per committed batch. If the
+    import fails part-way, the last line has stage "error" and the counts of
+    the batches committed before it.
+    """
+    fmt = format or detect_format(request.headers.get("content-type"))
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    if spool.tell() == 0:
+        spool.close()
+        raise HTTPException(status_code=400, detail="Empty import file.")
+    spool.seek(0)
+
+    async def progress_stream():
+        # The counts as of the last committed batch, for the final line if the import fails
+        committed = {}
+        try:
+            async with async_session() as session:
+                importer = BulkImporter(session, generate_reminders=generate_reminders)
+                committed = importer.progress("importing")
+                async for progress in importer.run(read_rows(spool, fmt)):
+                    committed = progress
+                    yield json.dumps(progress) + "\n"
+        except Exception:
+            # The 200 is already sent; end with a line that tells a failed import from a dropped connection
+            logger.exception("Bulk import failed")
+            yield json.dumps({**committed, "stage": "error", "error": "Import failed; batches reported before this line were saved."}) + "\n"
+        finally:
+            spool.close()
+
+    return StreamingResponse(progress_stream(), media_type="application/x-ndjson")
@@ -1,13 +1,22 @@
+import logging
+from typing import Literal, Optional, Union
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlmodel import select
+from sqlalchemy import case, func, literal, or_, true, tuple_
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from app.models.contact import Contact
 from app.models.vin import VIN
 from app.models.vin_contact_link import VINContactLink
-from app.schemas.contact.contact import ContactCreate, Contact as ContactSchema
-from app.core.database import get_session
+from app.schemas.contact.contact import ContactCreate, ContactPage, Contact as ContactSchema
+from app.core.database import get_session, get_read_session, dialect_insert
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.read_cache import read_cache, vin_tag
+from app.core.logging_config import mask_phone
+from app.core.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -28,87 +37,77 @@ async def create_contact(
 ):
     # Normalize the phone number
     normalized_phone = normalize_phone_number(contact_in.phone_number)
-    print(f"Attempting to create contact with phone number: {contact_in.phone_number} (normalized: {normalized_phone})")
-    
-    existing_contact_query = select(Contact).where(Contact.phone_number == normalized_phone)
-    existing_contact_result = await session.execute(existing_contact_query)
-    existing_contact_obj = existing_contact_result.scalar_one_or_none()
-
-    if existing_contact_obj:
-        print(f"Found existing contact with phone number: {existing_contact_obj.phone_number}")
-        # Update the existing contact's name and email if provided
-        # This allows "refreshing" contact info when someone re-adds with new details
-        if contact_in.name != existing_contact_obj.name:
-            existing_contact_obj.name = contact_in.name
-        if contact_in.email and contact_in.email != "" and contact_in.email != existing_contact_obj.email:
-            existing_contact_obj.email = contact_in.email
-        
-        await session.commit()
-        await session.refresh(existing_contact_obj)
-        return existing_contact_obj
-
-    # Create new contact since none exists with this phone number
-    contact = Contact.from_orm(contact_in)
-    contact.phone_number = normalized_phone  # Store normalized version
-    if contact.email == "":
-        contact.email = None
+    logger.debug("Creating contact", extra={"phone": mask_phone(normalized_phone)})
+    email = contact_in.email or None
+
+    # Find-or-create in one statement keyed on the normalized phone. Re-adding an
+    # existing number "refreshes" its name, and its email when one is provided.
+    stmt = dialect_insert(Contact).values(
+        tenant_id=current_tenant(), name=contact_in.name, phone_number=normalized_phone, email=email
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Contact.tenant_id, Contact.phone_number],
+        set_={
+            "name": stmt.excluded.name,
+            "email": func.coalesce(stmt.excluded.email, Contact.email),
+        },
+    ).returning(Contact)
     try:
-        session.add(contact)
+        result = await session.execute(stmt, execution_options={"populate_existing": True})
+        contact = result.scalar_one()
         await session.commit()
-        await session.refresh(contact)
-        return contact
     except IntegrityError as e:
         await session.rollback()
-        # This should rarely happen now since we check for existing contacts
-        if "ix_contact_phone_number" in str(e):
-            # Try to fetch the contact that was created by another concurrent request
-            retry_contact = await session.execute(existing_contact_query)
-            found_contact = retry_contact.scalar_one_or_none()
-            if found_contact:
-                return found_contact
-            raise HTTPException(status_code=400, detail="Contact with this phone number already exists.")
-        elif "ix_contact_email" in str(e):
+        if "ix_contact_tenant_email" in str(e):
             raise HTTPException(status_code=400, detail="Contact with this email already exists.")
-        else:
-            raise HTTPException(status_code=500, detail="An unexpected database error occurred.")
+        raise HTTPException(status_code=500, detail="An unexpected database error occurred.")
+
+    # An existing contact may have been renamed; drop cached reads of its vehicles
+    linked = await session.execute(select(VINContactLink.vin_id).where(VINContactLink.contact_id == contact.id))
+    await read_cache.invalidate(*(vin_tag(vin_id) for vin_id in linked.scalars()))
+    return contact
 
 @router.post("/{contact_id}/link_to_vin/{vin_id}")
 async def link_contact_to_vin(
     contact_id: int, vin_id: int, session: AsyncSession = Depends(get_session)
 ):
-    # Check if contact exists
-    contact = await session.get(Contact, contact_id)
-    if not contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-
-    # Check if VIN exists
-    vin = await session.get(VIN, vin_id)
-    if not vin:
-        raise HTTPException(status_code=404, detail="VIN not found")
-
-    # Check if link already exists
-    existing_link = await session.execute(
-        select(VINContactLink).where(
-            (VINContactLink.contact_id == contact_id) &
-            (VINContactLink.vin_id == vin_id)
+    # A single INSERT ... SELECT: only this shop's contact and VIN produce a row,
+    # and the composite primary key rejects duplicates
+    tenant_id = current_tenant()
+    stmt = (
+        dialect_insert(VINContactLink)
+        .from_select(
+            ["vin_id", "contact_id", "tenant_id"],
+            select(VIN.id, Contact.id, literal(tenant_id))
+            .join(Contact, true())
+            .where(VIN.id == vin_id, VIN.tenant_id == tenant_id, Contact.id == contact_id, Contact.tenant_id == tenant_id),
         )
+        .on_conflict_do_nothing(index_elements=[VINContactLink.vin_id, VINContactLink.contact_id])
+        .returning(VINContactLink.vin_id)
     )
-    if existing_link.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Contact already linked to this VIN")
+    result = await session.execute(stmt)
+    inserted = result.first()
+    await session.commit()
 
-    vin_contact_link = VINContactLink(contact_id=contact_id, vin_id=vin_id)
-    try:
-        session.add(vin_contact_link)
-        await session.commit()
-        return {"message": "Contact linked to VIN successfully"}
-    except IntegrityError as e:
-        await session.rollback()
-        raise HTTPException(status_code=400, detail="Contact is already linked to this VIN.")
+    if not inserted:
+        # Nothing inserted: find out why (only on this failure path)
+        if not await session.get(Contact, contact_id):
+            raise HTTPException(status_code=404, detail="Contact not found")
+        if not await session.get(VIN, vin_id):
+            raise HTTPException(status_code=404, detail="VIN not found")
+        raise HTTPException(status_code=400, detail="Contact already linked to this VIN")
+    await read_cache.invalidate(vin_tag(vin_id))
+    return {"message": "Contact linked to VIN successfully"}
 
 @router.get("/vin/{vin_id}", response_model=list[ContactSchema])
 async def get_contacts_for_vin(
     vin_id: int, session: AsyncSession = Depends(get_session)
 ):
+    cached = await read_cache.get("vin_contacts", str(vin_id))
+    if cached is not None:
+        return cached
+    epoch = await read_cache.epoch()
+
     # Load VIN with contact links and contacts
     result = await session.execute(
         select(VIN)
@@ -124,23 +123,118 @@ async def get_contacts_for_vin(
     for link in vin.contact_links:
         if link.contact:  # Safety check
             contacts.append(link.contact)
-    return contacts
 
-@router.get("/all", response_model=list[ContactSchema])
-async def get_all_contacts(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Contact))
-    contacts = result.scalars().all()
+    await read_cache.set(
+        "vin_contacts", str(vin_id), [ContactSchema.model_validate(c).model_dump(mode="json") for c in contacts],
+        [vin_tag(vin_id)], epoch,
+    )
     return contacts
 
+CONTACT_FIELDS = ("id", "name", "phone_number", "email")
+DEFAULT_CONTACT_PAGE_SIZE = 50
+
+@router.get("/all", response_model=Union[ContactPage, list[ContactSchema]])
+async def get_all_contacts(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    sort: Literal["name", "id"] = "name",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of id,name,phone_number,email"),
+    include_total: bool = False,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Keyset-paginated contact listing, returned as a ContactPage when any of
+    cursor, limit, fields or include_total is given (limit defaults to 50).
+    Pass next_cursor from the previous page as cursor; only the requested
+    fields (plus id and the sort key) are selected from the database.
+    Without any of them this is the original endpoint: every contact as a plain list.
+    """
+    if cursor is None and limit is None and fields is None and not include_total:
+        order = (Contact.name, Contact.id) if sort == "name" else (Contact.id,)
+        result = await session.execute(select(Contact).order_by(*order))
+        return result.scalars().all()
+    limit = limit or DEFAULT_CONTACT_PAGE_SIZE
+
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in CONTACT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown contact fields: {', '.join(unknown)}")
+    else:
+        requested = list(CONTACT_FIELDS)
+    selected = [f for f in CONTACT_FIELDS if f in requested or f in ("id", sort)]
+
+    query = select(*[getattr(Contact, f) for f in selected])
+    if sort == "name":
+        query = query.order_by(Contact.name, Contact.id)
+        if cursor:
+            last_name, last_id = decode_cursor(cursor, 2)
+            query = query.where(tuple_(Contact.name, Contact.id) > tuple_(last_name, last_id))
+    else:
+        query = query.order_by(Contact.id)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            query = query.where(Contact.id > last_id)
+
+    # Fetch one extra row to know whether another page exists
+    result = await session.execute(query.limit(limit + 1))
+    rows = [dict(row._mapping) for row in result]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([last["name"], last["id"]] if sort == "name" else [last["id"]])
+
+    total = None
+    if include_total:
+        total = (await session.execute(select(func.count()).select_from(Contact))).scalar_one()
+
+    return ContactPage(
+        items=[{f: row[f] for f in requested} for row in rows],
+        next_cursor=next_cursor,
+        total=total,
+    )
+
 @router.get("/search", response_model=list[ContactSchema])
 async def search_contacts(
-    phone_number: str = Query(..., min_length=3), session: AsyncSession = Depends(get_session)
+    phone_number: str = Query(..., min_length=3),
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    # Normalize the search term for better matching
-    normalized_search = normalize_phone_number(phone_number)
-    
+    """
+    Type-ahead search over contacts by phone number and name.
+    Matches are ranked exact, prefix, suffix, then substring phone matches,
+    followed by name matches. On Postgres the substring matches use the trigram
+    indexes from optional migration 4 (app/core/migrations.py); where pg_trgm
+    isn't available they still work, as sequential scans.
+    """
+    term = phone_number.strip()
+    digits = normalize_phone_number(term)
+
+    conditions = []
+    ranking = []
+    if len(digits) >= 3:
+        conditions.append(Contact.phone_number.contains(digits))
+        ranking += [
+            (Contact.phone_number == digits, 0),
+            (Contact.phone_number.startswith(digits), 1),
+            (Contact.phone_number.endswith(digits), 2),
+            (Contact.phone_number.contains(digits), 3),
+        ]
+    if any(c.isalpha() for c in term):
+        conditions.append(Contact.name.icontains(term, autoescape=True))
+        ranking.append((Contact.name.istartswith(term, autoescape=True), 4))
+
+    if not conditions:
+        return []
+
     result = await session.execute(
-        select(Contact).where(Contact.phone_number.like(f"%{normalized_search}%"))
+        select(Contact)
+        .where(or_(*conditions))
+        .order_by(case(*ranking, else_=5), Contact.name, Contact.id)
+        .limit(limit)
     )
     contacts = result.scalars().all()
     return contacts
@@ -1,49 +1,23 @@
 # app/routes/vin.py
-import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_session
+from app.core import vin_decoder
+from app.schemas.vin.vin_decode import VinDecodeBatchRequest, VinDecodeBatchResponse
 
 router = APIRouter()
 
 @router.get("/decode_vin/{vin}")
-async def decode_vin(vin: str):
-    if len(vin) != 17:
-        raise HTTPException(status_code=400, detail="VIN must be 17 characters long.")
-    
-    url = f"https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/{vin}?format=json"
-    
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            response = await client.get(url)
-            data = response.json()
-        except httpx.TimeoutException:
-            raise HTTPException(status_code=504, detail="NHTSA API timeout - please try again later.")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"NHTSA API unavailable: {str(e)}")
+async def decode_vin(vin: str, session: AsyncSession = Depends(get_session)):
+    # Validated and served from the local decoder/caches when possible; see app/core/vin_decoder.py
+    return await vin_decoder.decode_vin(vin, session)
 
-    if not data or "Results" not in data:
-        raise HTTPException(status_code=500, detail="Failed to decode VIN.")
-
-    result = {
-        "vin": vin,
-        "make": None,
-        "model": None,
-        "year": None,
-        "trim": None
-    }
-
-    for item in data["Results"]:
-        label = item.get("Variable")
-        value = item.get("Value")
-        if not value:
-            continue
-
-        if label == "Make":
-            result["make"] = value.upper()
-        elif label == "Model":
-            result["model"] = value.upper()
-        elif label == "Model Year":
-            result["year"] = int(value)
-        elif label == "Trim":
-            result["trim"] = value.upper()
-
-    return result
+@router.post("/decode_batch", response_model=VinDecodeBatchResponse)
+async def decode_batch(batch: VinDecodeBatchRequest, session: AsyncSession = Depends(get_session)):
+    results = await vin_decoder.decode_vins(batch.vins, session)
+    return VinDecodeBatchResponse(
+        results=results,
+        decoded=sum(1 for r in results if r["error"] is None),
+        partial=sum(1 for r in results if r["source"] == "offline"),
+        failed=sum(1 for r in results if r["source"] is None),
+    )
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends
 from sqlmodel import select, func
+from sqlalchemy import extract
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
 from typing import Optional
 from app.models.scheduled_message import ScheduledMessage
 from app.models.incoming_message import IncomingMessage
-from app.core.database import get_session
+from app.core.database import get_read_session
 
 router = APIRouter()
 
 @router.get("/costs/summary")
 async def get_cost_summary(
     date_filter: Optional[str] = None,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get SMS cost summary for outbound and inbound messages.
@@ -77,7 +78,7 @@ async def get_cost_summary(
     }
 
 @router.get("/costs/monthly")
-async def get_monthly_costs(session: AsyncSession = Depends(get_session)):
+async def get_monthly_costs(session: AsyncSession = Depends(get_read_session)):
     """Get cost breakdown by month for the current year"""
     
     current_year = datetime.now().year
@@ -85,22 +86,22 @@ async def get_monthly_costs(session: AsyncSession = Depends(get_session)):
     # Query for monthly outbound costs
     outbound_monthly = await session.execute(
         select(
-            func.extract('month', ScheduledMessage.sent_at).label('month'),
+            extract('month', ScheduledMessage.sent_at).label('month'),
             func.count(ScheduledMessage.id).label('count')
         ).where(
             ScheduledMessage.status == "sent",
-            func.extract('year', ScheduledMessage.sent_at) == current_year
-        ).group_by(func.extract('month', ScheduledMessage.sent_at))
+            extract('year', ScheduledMessage.sent_at) == current_year
+        ).group_by(extract('month', ScheduledMessage.sent_at))
     )
     
     # Query for monthly inbound costs
     inbound_monthly = await session.execute(
         select(
-            func.extract('month', IncomingMessage.created_at).label('month'),
+            extract('month', IncomingMessage.created_at).label('month'),
             func.count(IncomingMessage.id).label('count')
         ).where(
-            func.extract('year', IncomingMessage.created_at) == current_year
-        ).group_by(func.extract('month', IncomingMessage.created_at))
+            extract('year', IncomingMessage.created_at) == current_year
+        ).group_by(extract('month', IncomingMessage.created_at))
     )
     
     # Process results
@@ -8,7 +8,9 @@ from sqlmodel import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from twilio.twiml.messaging_response import MessagingResponse
 
-from app.core.database import get_session
+from app.core.database import get_session, get_read_session
+from app.core.security import get_current_user
+from app.core.tenancy import shop_for, tenant_for_number, tenant_id_var
 from app.models.contact import Contact
 from app.models.incoming_message import IncomingMessage
 
@@ -38,6 +40,10 @@ async def handle_inbound_sms(
 
     Stores the message and sends a standard auto-reply.
     """
+    # This route is unauthenticated; the Twilio number that was texted identifies the shop
+    tenant_id = tenant_for_number(to_number)
+    tenant_id_var.set(tenant_id)
+
     # Normalize the incoming phone number from E.164 format (e.g., +12223334444) 
     # to the format stored in the database (e.g., 2223334444).
     normalized_from_number = from_number.replace("+1", "", 1)
@@ -59,7 +65,7 @@ async def handle_inbound_sms(
     twiml_response = MessagingResponse()
     twiml_response.message(
         "Thank you for your message. This inbox is not actively monitored. "
-        "Please call the shop directly for assistance (323) 727-28823!"
+        f"Please call the shop directly for assistance {shop_for(tenant_id).phone}!"
     )
 
     return Response(content=str(twiml_response), media_type="application/xml")
@@ -69,8 +75,8 @@ from sqlalchemy.orm import selectinload
 
 # ... (rest of the imports)
 
-@router.get("/messages/inbound/unread-count")
-async def get_unread_message_count(session: AsyncSession = Depends(get_session)):
+@router.get("/messages/inbound/unread-count", dependencies=[Depends(get_current_user)])
+async def get_unread_message_count(session: AsyncSession = Depends(get_read_session)):
     """Get the count of unread inbound messages."""
     result = await session.execute(
         select(func.count(IncomingMessage.id)).where(IncomingMessage.is_read == False)
@@ -79,7 +85,7 @@ async def get_unread_message_count(session: AsyncSession = Depends(get_session))
     return {"unread_count": count}
 
 
-@router.post("/messages/inbound/mark-as-read")
+@router.post("/messages/inbound/mark-as-read", dependencies=[Depends(get_current_user)])
 async def mark_messages_as_read(session: AsyncSession = Depends(get_session)):
     """Mark all inbound messages as read."""
     await session.execute(
@@ -89,8 +95,8 @@ async def mark_messages_as_read(session: AsyncSession = Depends(get_session)):
     return {"success": True, "message": "All messages marked as read."}
 
 
-@router.get("/messages/inbound", response_model=InboundMessageResponse)
-async def get_inbound_messages(session: AsyncSession = Depends(get_session)):
+@router.get("/messages/inbound", response_model=InboundMessageResponse, dependencies=[Depends(get_current_user)])
+async def get_inbound_messages(session: AsyncSession = Depends(get_read_session)):
     """Get all inbound messages, newest first."""
     result = await session.execute(
         select(IncomingMessage)
@@ -1,33 +1,51 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_session
+from app.core.database import get_session, get_read_session
 from app.core.sms import send_sms
 from app.models.service_record import ServiceRecord
 from app.models.vin import VIN
 from app.models.contact import Contact
 from app.models.scheduled_message import ScheduledMessage
 from app.schemas.message.send_message import SendMessageRequest
-from datetime import datetime, timedelta, time
-from zoneinfo import ZoneInfo
+from app.core.reminders import build_reminder_message, reminder_send_time
+from app.core.mileage_model import reschedule_reminders
+from app.core.tenancy import current_tenant, shop_for
+from app.core.responses import FastJSONResponse, ListingShape, columnar
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # ---- Helpers ----
 
-def format_date(dt: datetime) -> str:
-    try:
-        return dt.strftime("%b %d, %Y")
-    except Exception:
-        return str(dt)
-
-
 def humanize_oil_type(oil_type: str) -> str:
     if not oil_type:
         return ""
     return oil_type.replace('_', ' ').title()
 
 
+# Fields of each listed message; the columnar shape has these columns even on an empty day
+MESSAGE_FIELDS = (
+    "id", "contact_name", "contact_phone", "vin_string", "vehicle_info",
+    "message_content", "scheduled_time", "sent_at", "status",
+)
+# Repeated on every message of the same contact / vehicle; the columnar shape sends each once
+MESSAGE_LOOKUPS = {"contacts": ("contact_name", "contact_phone"), "vins": ("vin_string", "vehicle_info")}
+
+
+def message_listing(date, message_list, shape: ListingShape, fields=MESSAGE_FIELDS) -> FastJSONResponse:
+    body = {"date_filter": date, "total_messages": len(message_list)}
+    if shape == "columnar":
+        body.update(columnar(message_list, fields, MESSAGE_LOOKUPS))
+    else:
+        body["messages"] = message_list
+    return FastJSONResponse(body)
+
+
 @router.post("/message/{message_id}/cancel")
 async def cancel_scheduled_message(message_id: int, session: AsyncSession = Depends(get_session)):
     msg = await session.get(ScheduledMessage, message_id)
@@ -47,26 +65,26 @@ async def cancel_pending_reminders_for_vin(vin_id: int, session: AsyncSession =
     if not vin:
         raise HTTPException(status_code=404, detail="VIN not found")
     result = await session.execute(
-        select(ScheduledMessage).where(
-            ScheduledMessage.vin_id == vin_id,
-            ScheduledMessage.status == "pending"
-        )
+        update(ScheduledMessage)
+        .where(ScheduledMessage.vin_id == vin_id, ScheduledMessage.status == "pending")
+        .values(status="canceled")
+        .execution_options(synchronize_session=False)
     )
-    msgs = result.scalars().all()
-    count = 0
-    for m in msgs:
-        # Treat only reminders (by content heuristic) to avoid touching immediate copies
-        if "reminder" in (m.message_content or "").lower() or True:
-            m.status = "canceled"
-            session.add(m)
-            count += 1
+    count = result.rowcount
     await session.commit()
     return {"success": True, "canceled": count}
 
 
+@router.post("/reminders/reschedule")
+async def reschedule_pending_reminders(session: AsyncSession = Depends(get_session)):
+    """Re-plan pending reminder times from each vehicle's miles-per-day (also runs daily in the scheduler)."""
+    stats = await reschedule_reminders(session, tenant_id=current_tenant())
+    return {"success": True, **stats}
+
+
 @router.get("/all-outbound")
 async def get_all_outbound_messages(
-    date: str = None, session: AsyncSession = Depends(get_session)
+    date: str = None, shape: ListingShape = "rows", session: AsyncSession = Depends(get_read_session)
 ):
     """Get all outbound messages across all VINs, optionally filtered by date"""
     from datetime import datetime, date as date_type
@@ -104,11 +122,7 @@ async def get_all_outbound_messages(
             "is_reminder": "reminder" in msg.message_content.lower()
         })
 
-    return {
-        "date_filter": date,
-        "total_messages": len(message_list),
-        "messages": message_list
-    }
+    return message_listing(date, message_list, shape, MESSAGE_FIELDS + ("is_reminder",))
 
 @router.get("/service-record/{service_record_id}/pickup-sent")
 async def has_pickup_been_sent_for_service_record(
@@ -129,7 +143,7 @@ async def has_pickup_been_sent_for_service_record(
 
 @router.get("/pickup-messages")
 async def get_pickup_messages(
-    date: str = None, session: AsyncSession = Depends(get_session)
+    date: str = None, shape: ListingShape = "rows", session: AsyncSession = Depends(get_read_session)
 ):
     """Get all pickup messages across all VINs, optionally filtered by date"""
     
@@ -172,15 +186,11 @@ async def get_pickup_messages(
             "status": msg.status
         })
 
-    return {
-        "date_filter": date,
-        "total_messages": len(message_list),
-        "messages": message_list
-    }
+    return message_listing(date, message_list, shape)
 
 @router.get("/reminder-messages")
 async def get_reminder_messages(
-    date: str = None, session: AsyncSession = Depends(get_session)
+    date: str = None, shape: ListingShape = "rows", session: AsyncSession = Depends(get_read_session)
 ):
     """Get all reminder messages across all VINs, optionally filtered by date"""
     
@@ -223,15 +233,11 @@ async def get_reminder_messages(
             "status": msg.status
         })
 
-    return {
-        "date_filter": date,
-        "total_messages": len(message_list),
-        "messages": message_list
-    }
+    return message_listing(date, message_list, shape)
 
 @router.get("/reminder-messages-created")
 async def get_reminder_messages_created(
-    date: str = None, session: AsyncSession = Depends(get_session)
+    date: str = None, shape: ListingShape = "rows", session: AsyncSession = Depends(get_read_session)
 ):
     """Get reminder messages by creation date (when they were scheduled), not by scheduled_time."""
     query = select(ScheduledMessage).where(
@@ -266,11 +272,11 @@ async def get_reminder_messages_created(
             "sent_at": msg.sent_at,
             "status": msg.status
         })
-    return {"date_filter": date, "total_messages": len(message_list), "messages": message_list}
+    return message_listing(date, message_list, shape, MESSAGE_FIELDS + ("created_at",))
 
 @router.get("/vin/{vin_id}/history")
 async def get_message_history_for_vin(
-    vin_id: int, session: AsyncSession = Depends(get_session)
+    vin_id: int, session: AsyncSession = Depends(get_read_session)
 ):
     """Get all message history for a specific VIN"""
     # Check if VIN exists
@@ -310,7 +316,7 @@ async def get_message_history_for_vin(
 
 @router.get("/vin/{vin_id}/pickup-history")
 async def get_pickup_history_for_vin(
-    vin_id: int, session: AsyncSession = Depends(get_session)
+    vin_id: int, session: AsyncSession = Depends(get_read_session)
 ):
     """Get pickup message history for a specific VIN"""
     # Check if VIN exists
@@ -352,7 +358,7 @@ async def get_pickup_history_for_vin(
 
 @router.get("/vin/{vin_id}/reminder-history")
 async def get_reminder_history_for_vin(
-    vin_id: int, session: AsyncSession = Depends(get_session)
+    vin_id: int, session: AsyncSession = Depends(get_read_session)
 ):
     """Get reminder message history for a specific VIN"""
     # Check if VIN exists
@@ -409,14 +415,16 @@ async def send_pickup_message(
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
+    shop = shop_for(current_tenant())
+
     # 2. Send immediate pickup message (content provided by client prefilled)
     sms_sent = False
     if contact.phone_number:
         try:
-            sms_result = await send_sms(contact.phone_number, request.immediate_message_content)
+            sms_result = await send_sms(contact.phone_number, request.immediate_message_content, from_number=shop.sms_number)
             sms_sent = sms_result is not None
-        except Exception as e:
-            print(f"Error sending SMS: {e}")
+        except Exception:
+            logger.exception("Error sending pickup SMS for service record %s", service_record.id)
             # Continue with scheduling even if SMS fails
 
     # 3. Store the immediate pickup message in the database
@@ -442,29 +450,22 @@ async def send_pickup_message(
     last_service = last_service_result.scalars().first()
     last_mileage = last_service.mileage_at_service if last_service else service_record.mileage_at_service
 
-    reminder_message = (
-        f"Hi {contact.name}, friendly heads up: your {vin.make} {vin.model} is due for service at "
-        f"{service_record.next_service_mileage_due} mi or by {format_date(service_record.next_service_date_due)}. "
-        "We'll be here when you're ready - Montebello Lube N' Tune, 2130 W Beverly Blvd. Mon-Sat 8-5. (323) 727-2883. "
-        "Reply STOP to unsubscribe."
+    reminder_message = build_reminder_message(
+        contact.name,
+        vin.make,
+        vin.model,
+        service_record.next_service_mileage_due,
+        service_record.next_service_date_due,
+        shop.signature,
     )
 
-    # Calculate the reminder date to be 17 days before the actual due date
-    reminder_send_date = service_record.next_service_date_due - timedelta(days=17)
-
     scheduled_msg = ScheduledMessage(
         contact_id=contact.id,
         vin_id=vin.id,
         service_record_id=service_record.id,
         message_content=reminder_message,
-        # Schedule at 11:00 AM America/Los_Angeles; store as naive UTC for comparison
-        scheduled_time=(
-            datetime.combine(
-                reminder_send_date,
-                time(11, 0, 0),
-                tzinfo=ZoneInfo("America/Los_Angeles")
-            ).astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
-        ),
+        # 17 days before the due date at 11:00 AM America/Los_Angeles, stored as naive UTC
+        scheduled_time=reminder_send_time(service_record.next_service_date_due),
         is_reminder=True
     )
     session.add(scheduled_msg)
@@ -479,7 +480,7 @@ async def send_pickup_message(
 
 @router.get("/sent-reminders")
 async def get_sent_reminders(
-    date: str = None, session: AsyncSession = Depends(get_session)
+    date: str = None, shape: ListingShape = "rows", session: AsyncSession = Depends(get_read_session)
 ):
     """Get sent reminder messages across all VINs, optionally filtered by date"""
     query = select(ScheduledMessage).where(
@@ -514,4 +515,4 @@ async def get_sent_reminders(
             "sent_at": msg.sent_at,
             "status": msg.status
         })
-    return {"date_filter": date, "total_messages": len(message_list), "messages": message_list}
+    return message_listing(date, message_list, shape)
@@ -1,57 +1,51 @@
+from datetime import date
 from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload
-from app.models.vin_contact_link import VINContactLink
-from sqlalchemy.orm import selectinload
-from sqlalchemy.orm import selectinload
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.service_record import ServiceRecord
 from app.schemas.service_record.create_service_record import ServiceRecordCreate
 from app.models.vin import VIN
-from app.models.contact import Contact
 from app.models.scheduled_message import ScheduledMessage
-from app.models.vin_contact_link import VINContactLink
-from app.models.vin_contact_link import VINContactLink
 from app.core.database import get_session
-from app.core.sms import send_sms
-from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta
+from app.core.read_cache import read_cache, vin_tag
+from app.core.tenancy import current_tenant
 
 
 router = APIRouter()
 
 @router.post("/")
 async def add_service_record(record_in: ServiceRecordCreate, session: AsyncSession = Depends(get_session)):
-    # Fetch VIN with its contacts eagerly loaded
-    result = await session.execute(
-        select(VIN).where(VIN.vin == record_in.vin).options(selectinload(VIN.contact_links).selectinload(VINContactLink.contact))
-    )
-    vin = result.scalars().first()
-    if not vin:
-        raise HTTPException(status_code=404, detail="VIN not found")
-
     # Note: Removed duplicate prevention to allow multiple service records per day
     # Real auto shops may need to record multiple services or corrections on the same day
-
-    # Create a new ServiceRecord instance
     record_data = record_in.dict()
-    record_data.pop("vin")
-    record = ServiceRecord(**record_data, vin_id=vin.id)
-    
-    session.add(record)
-    await session.commit()
-    await session.refresh(record)
+    vin_string = record_data.pop("vin")
+    record_data["service_date"] = record_data["service_date"] or date.today()
 
-    # Cancel any pending reminders for this VIN to avoid outdated messages
-    pending_q = await session.execute(
-        select(ScheduledMessage).where(
-            ScheduledMessage.vin_id == vin.id,
-            ScheduledMessage.status == "pending"
+    # INSERT ... SELECT resolves the shop's VIN in the same statement; no row back means no such VIN
+    record_data["tenant_id"] = current_tenant()
+    columns = list(record_data)
+    result = await session.execute(
+        insert(ServiceRecord)
+        .from_select(
+            ["vin_id", *columns],
+            select(VIN.id, *(literal(record_data[c], ServiceRecord.__table__.c[c].type) for c in columns))
+            .where(VIN.vin == vin_string, VIN.tenant_id == record_data["tenant_id"]),
         )
+        .returning(ServiceRecord)
+    )
+    record = result.scalar_one_or_none()
+    if not record:
+        raise HTTPException(status_code=404, detail="VIN not found")
+
+    # Cancel any pending reminders for this VIN to avoid outdated messages, in the
+    # same transaction so a failure can't leave a new record with stale reminders
+    await session.execute(
+        update(ScheduledMessage)
+        .where(ScheduledMessage.vin_id == record.vin_id, ScheduledMessage.status == "pending")
+        .values(status="canceled")
+        .execution_options(synchronize_session=False)
     )
-    for msg in pending_q.scalars().all():
-        msg.status = "canceled"
-        session.add(msg)
     await session.commit()
+    await read_cache.invalidate(vin_tag(record.vin_id))
 
     return record
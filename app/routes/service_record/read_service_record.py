@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload
@@ -6,11 +7,14 @@ from app.models.vin import VIN
 from app.models.contact import Contact
 from app.models.vin_contact_link import VINContactLink
 from app.core.database import get_session
+from app.core.read_cache import read_cache, vin_tag
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.service_record.read_service_record import ServiceRecordRead
 
 from app.schemas.vin.vin_read_simple import VINReadSimple
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/{service_record_id}", response_model=ServiceRecordRead)
@@ -19,6 +23,11 @@ async def get_service_record(service_record_id: int, session: AsyncSession = Dep
     Fetches a single service record by its ID, including the full VIN object
     and all associated contacts.
     """
+    cached = await read_cache.get("service_record", str(service_record_id))
+    if cached is not None:
+        return cached
+    epoch = await read_cache.epoch()
+
     result = await session.execute(
         select(ServiceRecord)
         .where(ServiceRecord.id == service_record_id)
@@ -36,12 +45,8 @@ async def get_service_record(service_record_id: int, session: AsyncSession = Dep
         raise HTTPException(status_code=404, detail="Service Record not found")
 
     vin_orm = service_record.vin
-    print(f"DEBUG: vin_orm: {vin_orm}")
-    print(f"DEBUG: vin_orm.contact_links: {vin_orm.contact_links}")
     contacts_for_vin_simple = []
     for link in vin_orm.contact_links:
-        print(f"DEBUG: Processing link: {link}")
-        print(f"DEBUG: link.contact: {link.contact}")
         if link.contact:
             contact_data = {
                 "id": link.contact.id,
@@ -50,10 +55,7 @@ async def get_service_record(service_record_id: int, session: AsyncSession = Dep
                 "email": link.contact.email
             }
             contacts_for_vin_simple.append(Contact.model_validate(contact_data))
-            print(f"DEBUG: Added contact to list: {link.contact.name}")
-        else:
-            print("DEBUG: link.contact is None or not loaded")
-    print(f"DEBUG: Final contacts_for_vin_simple: {contacts_for_vin_simple}")
+    logger.debug("Loaded service record %s with %d contacts", service_record_id, len(contacts_for_vin_simple))
 
     vin_read_simple_instance = VINReadSimple(
         id=vin_orm.id,
@@ -78,4 +80,8 @@ async def get_service_record(service_record_id: int, session: AsyncSession = Dep
         vin=vin_read_simple_instance # Pass the manually constructed VINReadSimple
     )
 
+    await read_cache.set(
+        "service_record", str(service_record_id), service_record_read_instance.model_dump(mode="json"),
+        [vin_tag(vin_orm.id)], epoch,
+    )
     return service_record_read_instance
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from app.core.read_cache import read_cache
+from app.core import vin_decoder
+from app.core.tenancy import current_tenant
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_cache_stats():
+    """Hit/miss counters for this worker's caches."""
+    return {
+        "read_cache": read_cache.stats(),
+        "vin_decode": {"entries": len(vin_decoder.decode_cache), "pattern_entries": len(vin_decoder.pattern_cache)},
+    }
+
+@router.post("/clear")
+async def clear_cache():
+    """Drop the calling shop's cached reads; other shops' entries stay warm."""
+    await read_cache.clear(current_tenant())
+    return {"message": "Read cache cleared"}
@@ -0,0 +1,45 @@
+import logging
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.database import engine, ping_database, read_engine
+from app.core.metrics import (
+    DB_PING, DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_SIZE, DB_UP, render_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Optional bearer token for scrapers; without it /metrics is open like /health
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+async def collect_database_metrics() -> None:
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    for name, db_engine in engines.items():
+        pool = db_engine.sync_engine.pool
+        DB_POOL_SIZE.set(pool.size(), name)
+        DB_POOL_CHECKED_OUT.set(pool.checkedout(), name)
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0), name)
+        try:
+            DB_PING.set(await ping_database(db_engine), name)
+            DB_UP.set(1, name)
+        except Exception as e:
+            logger.warning("Metrics: %s database ping failed: %s", name, e)
+            DB_UP.set(0, name)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text format: per-route requests and latency, in-flight requests, DB pool and DB health."""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    await collect_database_metrics()
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,37 @@
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core import profiler
+from app.schemas.system.profiler import ProfilerArmRequest
+
+router = APIRouter()
+
+
+@router.post("/arm")
+async def arm_profiler(request: ProfilerArmRequest):
+    """Profile the next `count` requests to a route (or scheduler ticks) handled by this worker."""
+    profiler.arm(request.target, request.count)
+    return {"armed": profiler.armed}
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """Profiles in the on-disk ring, newest first."""
+    return {
+        "armed": profiler.armed,
+        "profiles": [
+            {"name": name, "bytes": os.path.getsize(os.path.join(profiler.PROFILE_DIR, name))}
+            for name in profiler.list_profiles()
+        ],
+    }
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse)
+async def get_profile(name: str):
+    """Folded stacks ("frame;frame;frame samples" per line) for flamegraph.pl or speedscope."""
+    if name not in profiler.list_profiles():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(os.path.join(profiler.PROFILE_DIR, name)) as f:
+        return PlainTextResponse(f.read())
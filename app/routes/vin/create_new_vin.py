@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.vin import VIN
 from app.schemas.vin.create_new_vin import VinCreate
-from app.core.database import get_session
+from app.core.database import get_session, dialect_insert
+from app.core.read_cache import read_cache, VINS_TAG
+from app.core.tenancy import current_tenant
 
 router = APIRouter()
 
@@ -11,14 +12,18 @@ router = APIRouter()
 async def create_vin(
     vin_in: VinCreate, session: AsyncSession = Depends(get_session)
 ):
-    result = await session.execute(select(VIN).where(VIN.vin == vin_in.vin))
-    vin_exists = result.scalar_one_or_none()
-    
-    if vin_exists:
+    # Insert-if-absent in one statement; the unique (tenant_id, vin) index decides races
+    result = await session.execute(
+        dialect_insert(VIN)
+        .values(**vin_in.dict(), tenant_id=current_tenant())
+        .on_conflict_do_nothing(index_elements=[VIN.tenant_id, VIN.vin])
+        .returning(VIN)
+    )
+    vin = result.scalar_one_or_none()
+
+    if not vin:
         raise HTTPException(status_code=400, detail="VIN already exists")
 
-    vin = VIN.from_orm(vin_in)
-    session.add(vin)
     await session.commit()
-    await session.refresh(vin)
+    await read_cache.invalidate(VINS_TAG)
     return vin
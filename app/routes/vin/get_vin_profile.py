@@ -1,29 +1,228 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlmodel import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import case, func, or_, tuple_
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.vin import VIN
+from app.models.service_record import ServiceRecord
 from app.models.vin_contact_link import VINContactLink
-from app.core.database import get_session
+from app.models.contact import Contact as ContactModel
+from app.models.scheduled_message import ScheduledMessage
+from app.core.database import get_session, get_read_session
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.read_cache import read_cache, vin_tag, VINS_TAG
 from app.schemas.service_record.read_service_record import ServiceRecordRead
 from app.schemas.contact.contact import Contact
-from app.schemas.vin.read_vin_profile import VinProfileRead
+from app.schemas.vin.read_vin_profile import VinProfileRead, ServiceSummary, ServiceRecordPage
+from app.schemas.vin.vin_read_simple import VINReadSimple
+from app.schemas.vin.vin_lookup import VinLookupCandidate
+from app.schemas.vin.vin_dashboard import VinDashboard, VinMessage, VinMessageHistory
 
 router = APIRouter()
 
+# Shortest partial VIN treated as a suffix; anything shorter only matches plates
+MIN_VIN_SUFFIX_LENGTH = 4
+
+def normalize_lookup_query(q: str) -> str:
+    """Uppercase and drop spaces/dashes so "7abc 123" matches plate 7ABC123"""
+    return "".join(c for c in q.upper() if c.isalnum())
+
+@router.get("/lookup", response_model=list[VinLookupCandidate])
+async def lookup_vin(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(10, ge=1, le=50),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Front-desk vehicle search by full VIN, VIN suffix (e.g. last 6 or 8) or plate.
+    Every branch is an indexed equality or prefix match. Candidates are ranked
+    exact VIN, exact plate, VIN suffix, then plate prefix.
+    """
+    term = normalize_lookup_query(q)
+    columns = (VIN.id, VIN.vin, VIN.make, VIN.model, VIN.year, VIN.trim, VIN.plate)
+
+    if len(term) == 17:
+        result = await session.execute(select(*columns).where(VIN.vin == term))
+        return [VinLookupCandidate(**row._mapping, match="vin") for row in result]
+
+    reversed_prefix = f"{term[::-1]}%"
+    conditions = [VIN.plate_normalized.like(f"{term}%")]
+    ranking = [(VIN.plate_normalized == term, 1)]
+    if len(term) >= MIN_VIN_SUFFIX_LENGTH:
+        conditions.append(VIN.vin_reversed.like(reversed_prefix))
+        ranking.append((VIN.vin_reversed.like(reversed_prefix), 2))
+    rank = case(*ranking, else_=3).label("rank")
+
+    result = await session.execute(
+        select(*columns, rank)
+        .where(or_(*conditions))
+        .order_by(rank, VIN.id.desc())
+        .limit(limit)
+    )
+    match_by_rank = {1: "plate", 2: "vin_suffix", 3: "plate_prefix"}
+    candidates = []
+    for row in result:
+        fields = dict(row._mapping)
+        match = match_by_rank[fields.pop("rank")]
+        candidates.append(VinLookupCandidate(**fields, match=match))
+    return candidates
+
+def vin_read_simple(vin: VIN) -> VINReadSimple:
+    return VINReadSimple(id=vin.id, vin=vin.vin, make=vin.make, model=vin.model, year=vin.year, trim=vin.trim, plate=vin.plate)
+
+async def fetch_service_page(session: AsyncSession, vin: VIN, limit: int, cursor: Optional[str] = None):
+    """Newest-first page of a vehicle's service records, keyset-paginated on (service_date, id)"""
+    query = select(ServiceRecord).where(ServiceRecord.vin_id == vin.id)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        try:
+            last_date = date.fromisoformat(last_date)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(ServiceRecord.service_date, ServiceRecord.id) < (last_date, last_id))
+    query = query.order_by(ServiceRecord.service_date.desc(), ServiceRecord.id.desc()).limit(limit + 1)
+
+    records = (await session.execute(query)).scalars().all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor([records[-1].service_date.isoformat(), records[-1].id])
+
+    # The parent VIN is shared by every record; build its read model once
+    parent = vin_read_simple(vin)
+    items = [
+        ServiceRecordRead(
+            id=sr.id,
+            service_date=sr.service_date,
+            oil_type=sr.oil_type,
+            oil_viscosity=sr.oil_viscosity,
+            mileage_at_service=sr.mileage_at_service,
+            next_service_mileage_due=sr.next_service_mileage_due,
+            next_service_date_due=sr.next_service_date_due,
+            notes=sr.notes,
+            vin=parent,
+        )
+        for sr in records
+    ]
+    return items, next_cursor
+
+async def build_vin_profile(session: AsyncSession, vin: VIN, service_limit: int) -> VinProfileRead:
+    """Profile of a VIN loaded with its contact links: the newest service records and a summary of all of them"""
+    service_records, next_service_cursor = await fetch_service_page(session, vin, service_limit)
+
+    summary = ServiceSummary()
+    if service_records:
+        latest = service_records[0]
+        if next_service_cursor:
+            summary.service_count = (await session.execute(
+                select(func.count()).select_from(ServiceRecord).where(ServiceRecord.vin_id == vin.id)
+            )).scalar_one()
+        else:
+            summary.service_count = len(service_records)
+        summary.last_service_date = latest.service_date
+        summary.last_service_mileage = latest.mileage_at_service
+        summary.next_service_date_due = latest.next_service_date_due
+        summary.next_service_mileage_due = latest.next_service_mileage_due
+
+    return VinProfileRead(
+        id=vin.id,
+        vin=vin.vin,
+        make=vin.make,
+        model=vin.model,
+        year=vin.year,
+        trim=vin.trim,
+        plate=vin.plate,
+        summary=summary,
+        service_records=service_records,
+        next_service_cursor=next_service_cursor,
+        contacts=[Contact.from_orm(link.contact) for link in vin.contact_links if link.contact] # Convert to ContactRead
+    )
+
+@router.get("/{vin_id}/service-records", response_model=ServiceRecordPage)
+async def get_vin_service_records(
+    vin_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Older service history for the profile screen; pass next_cursor from the previous page."""
+    vin = await session.get(VIN, vin_id)
+    if not vin:
+        raise HTTPException(status_code=404, detail="VIN not found")
+    items, next_cursor = await fetch_service_page(session, vin, limit, cursor)
+    return ServiceRecordPage(items=items, next_cursor=next_cursor)
+
+@router.get("/{vin_id}/dashboard", response_model=VinDashboard)
+async def get_vin_dashboard(
+    vin_id: int,
+    service_limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Everything the vehicle screen shows in one response: the profile, its pickup
+    and reminder messages, and which service records already had a pickup text.
+    A fixed handful of queries however long the history is.
+    """
+    vin = await session.get(
+        VIN, vin_id, options=[selectinload(VIN.contact_links).selectinload(VINContactLink.contact)]
+    )
+    if not vin:
+        raise HTTPException(status_code=404, detail="VIN not found")
+    profile = await build_vin_profile(session, vin, service_limit)
+
+    # Contact names come from the join, not a lookup per message
+    result = await session.execute(
+        select(ScheduledMessage, ContactModel.name, ContactModel.phone_number)
+        .outerjoin(ContactModel, ContactModel.id == ScheduledMessage.contact_id)
+        .where(ScheduledMessage.vin_id == vin.id)
+        .order_by(ScheduledMessage.scheduled_time.desc(), ScheduledMessage.id.desc())
+    )
+    messages = VinMessageHistory()
+    pickup_sent = set()
+    for msg, contact_name, contact_phone in result:
+        item = VinMessage(
+            id=msg.id,
+            service_record_id=msg.service_record_id,
+            contact_name=contact_name or "Unknown",
+            contact_phone=contact_phone or "Unknown",
+            message_content=msg.message_content,
+            scheduled_time=msg.scheduled_time,
+            sent_at=msg.sent_at,
+            status=msg.status,
+        )
+        if msg.is_reminder:
+            messages.reminder.append(item)
+        else:
+            messages.pickup.append(item)
+            if msg.service_record_id is not None:
+                pickup_sent.add(msg.service_record_id)
+
+    return VinDashboard(profile=profile, messages=messages, pickup_sent_service_record_ids=sorted(pickup_sent))
+
 @router.get("/{vin_or_last8}", response_model=VinProfileRead)
 async def get_vin_profile(
     vin_or_last8: str,
+    service_limit: int = Query(10, ge=1, le=100),
     session: AsyncSession = Depends(get_session),
 ):
+    cache_key = f"{vin_or_last8}:{service_limit}"
+    cached = await read_cache.get("vin_profile", cache_key)
+    if cached is not None:
+        return cached
+    epoch = await read_cache.epoch()
+
     # Compose query based on VIN length
     if len(vin_or_last8) == 17:
         query = select(VIN).where(VIN.vin == vin_or_last8)
     else:
-        query = select(VIN).where(VIN.vin.endswith(vin_or_last8.upper()))
+        # Suffix match as an indexed prefix match on the reversed VIN
+        query = select(VIN).where(VIN.vin_reversed.like(f"{vin_or_last8.upper()[::-1]}%"))
 
-    # Use options to eager load related service_records
-    query = query.options(joinedload(VIN.service_records), joinedload(VIN.contact_links).joinedload(VINContactLink.contact))
+    # Contacts load in their own selectin queries rather than being joined in, so
+    # the row count never multiplies with the service history
+    query = query.options(selectinload(VIN.contact_links).selectinload(VINContactLink.contact))
 
     # Execute asynchronously
     result = await session.execute(query)
@@ -32,17 +231,9 @@ async def get_vin_profile(
     if not vin:
         raise HTTPException(status_code=404, detail="VIN not found")
 
-    # Manually construct VinProfileRead to include contacts and service records as their Read schemas
-    vin_profile_read = VinProfileRead(
-        id=vin.id,
-        vin=vin.vin,
-        make=vin.make,
-        model=vin.model,
-        year=vin.year,
-        trim=vin.trim,
-        plate=vin.plate,
-        service_records=[ServiceRecordRead.from_orm(sr) for sr in vin.service_records], # Convert to ServiceRecordRead
-        contacts=[Contact.from_orm(link.contact) for link in vin.contact_links if link.contact] # Convert to ContactRead
-    )
+    profile = await build_vin_profile(session, vin, service_limit)
 
-    return vin_profile_read
+    # A suffix can start matching a newer VIN, so those entries also expire when any VIN is added
+    tags = [vin_tag(vin.id)] if len(vin_or_last8) == 17 else [vin_tag(vin.id), VINS_TAG]
+    await read_cache.set("vin_profile", cache_key, profile.model_dump(mode="json"), tags, epoch)
+    return profile
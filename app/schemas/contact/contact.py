@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict, Any
 
 class ContactBase(BaseModel):
     name: str
@@ -14,3 +14,8 @@ class Contact(ContactBase):
 
     class Config:
         from_attributes = True
+
+class ContactPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class ProfilerArmRequest(BaseModel):
+    # "<METHOD> <route template>", e.g. "GET /vin/{vin_or_last8}", or "scheduler" for scheduler ticks
+    target: str
+    count: int = Field(1, ge=1, le=100)
@@ -1,8 +1,16 @@
 from pydantic import BaseModel
 from typing import Optional, List
+from datetime import date
 from app.schemas.service_record.read_service_record import ServiceRecordRead
 from app.schemas.contact.contact import Contact
 
+class ServiceSummary(BaseModel):
+    service_count: int = 0
+    last_service_date: Optional[date] = None
+    last_service_mileage: Optional[int] = None
+    next_service_date_due: Optional[date] = None
+    next_service_mileage_due: Optional[int] = None
+
 class VinProfileRead(BaseModel):
     id: int
     vin: str
@@ -11,8 +19,15 @@ class VinProfileRead(BaseModel):
     year: int
     trim: Optional[str] = None
     plate: Optional[str] = None
+    summary: ServiceSummary = ServiceSummary()
+    # Most recent first; pass next_service_cursor to /vin/{id}/service-records for older ones
     service_records: List[ServiceRecordRead] = []
+    next_service_cursor: Optional[str] = None
     contacts: List[Contact] = []
 
     class Config:
         from_attributes = True
+
+class ServiceRecordPage(BaseModel):
+    items: List[ServiceRecordRead]
+    next_cursor: Optional[str] = None
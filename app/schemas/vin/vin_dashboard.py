@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from app.schemas.vin.read_vin_profile import VinProfileRead
+
+class VinMessage(BaseModel):
+    id: int
+    service_record_id: Optional[int] = None
+    contact_name: str
+    contact_phone: str
+    message_content: str
+    scheduled_time: datetime
+    sent_at: Optional[datetime] = None
+    status: str
+
+class VinMessageHistory(BaseModel):
+    # Newest scheduled first
+    pickup: List[VinMessage] = []
+    reminder: List[VinMessage] = []
+
+class VinDashboard(BaseModel):
+    profile: VinProfileRead
+    messages: VinMessageHistory
+    # Covers every service record of the vehicle, including ones past the first page
+    pickup_sent_service_record_ids: List[int] = []
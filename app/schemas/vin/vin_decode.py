@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
+
+class VinDecodeBatchRequest(BaseModel):
+    vins: List[str] = Field(..., min_length=1, max_length=500)
+
+class VinDecodeResult(BaseModel):
+    vin: str
+    make: Optional[str] = None
+    model: Optional[str] = None
+    year: Optional[int] = None
+    trim: Optional[str] = None
+    source: Optional[Literal["cache", "pattern", "nhtsa", "offline"]] = None
+    error: Optional[str] = None
+
+class VinDecodeBatchResponse(BaseModel):
+    results: List[VinDecodeResult]
+    decoded: int
+    partial: int
+    failed: int
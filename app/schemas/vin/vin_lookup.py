@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional, Literal
+
+class VinLookupCandidate(BaseModel):
+    id: int
+    vin: str
+    make: str
+    model: str
+    year: int
+    trim: Optional[str] = None
+    plate: Optional[str] = None
+    match: Literal["vin", "plate", "vin_suffix", "plate_prefix"]
+
+    class Config:
+        from_attributes = True
@@ -23,6 +23,11 @@ window.addEventListener("load", async () => {
     }
 });
 
+// The open vehicle's /vin/{id}/dashboard response: profile, message history and
+// pickup-sent flags in one request. The history tabs render from it; apiFetch
+// drops it after any successful write so they never show stale statuses.
+let currentVinDashboard = null;
+
 // Helper function for all future API calls
 async function apiFetch(url, method = 'GET', body = null) {
     const token = localStorage.getItem("authToken");
@@ -57,6 +62,10 @@ async function apiFetch(url, method = 'GET', body = null) {
         
         // Success case
         const data = await response.json();
+        if (method !== 'GET') {
+            // Cancels, sends, scheduling and contact changes all show up on the vehicle screen
+            currentVinDashboard = null;
+        }
         return { success: true, data: data };
         
     } catch (error) {
@@ -654,22 +663,36 @@ async function loadCostsSummary(dateFilter = null) {
 }
 
 // Badge updater: show/hide the "Pickup Sent" badge for a given service record
-async function updatePickupSentBadge(serviceRecordId) {
-    try {
-        const result = await apiFetch(`/messages/service-record/${serviceRecordId}/pickup-sent`);
-        const pickupSent = result && result.success && result.data && result.data.pickup_sent;
-        const badge = document.getElementById(`pickup-badge-${serviceRecordId}`);
-        if (badge) {
-            badge.style.display = pickupSent ? 'inline-block' : 'none';
-            if (pickupSent) {
-                badge.title = 'A pickup message has already been sent for this service record.';
-            }
+function setPickupSentBadge(serviceRecordId, pickupSent) {
+    const badge = document.getElementById(`pickup-badge-${serviceRecordId}`);
+    if (badge) {
+        badge.style.display = pickupSent ? 'inline-block' : 'none';
+        if (pickupSent) {
+            badge.title = 'A pickup message has already been sent for this service record.';
         }
-    } catch (err) {
-        console.error('Failed to update pickup-sent badge for service record', serviceRecordId, err);
     }
 }
 
+async function getVinDashboard(vinId) {
+    if (currentVinDashboard && currentVinDashboard.profile.id === vinId) {
+        return { success: true, data: currentVinDashboard };
+    }
+    const result = await apiFetch(`/vin/${vinId}/dashboard`);
+    if (result.success) {
+        currentVinDashboard = result.data;
+    }
+    return result;
+}
+
+function setPickupSentBadges(serviceRecords) {
+    const sent = new Set((currentVinDashboard && currentVinDashboard.pickup_sent_service_record_ids) || []);
+    serviceRecords.forEach(sr => setPickupSentBadge(sr.id, sent.has(sr.id)));
+}
+
+function vinHeading(profile) {
+    return `${profile.year} ${profile.make} ${profile.model} (${profile.vin})`;
+}
+
 // Note: apiFetch function is defined at the top of the file
 
 async function loadMessageHistory(vinId) {
@@ -729,16 +752,16 @@ async function loadPickupHistory(vinId) {
     historyContent.innerHTML = '<p>Loading pickup history...</p>';
 
     try {
-        const result = await apiFetch(`/messages/vin/${vinId}/pickup-history`);
+        const result = await getVinDashboard(vinId);
         
         if (result.success) {
             const history = result.data;
-            if (history.pickup_history.length === 0) {
+            if (history.messages.pickup.length === 0) {
                 historyContent.innerHTML = '<p>No pickup messages found for this vehicle.</p>';
                 return;
             }
 
-            const historyHtml = history.pickup_history.map(msg => `
+            const historyHtml = history.messages.pickup.map(msg => `
                 <div class="message-history-item ${msg.status === 'sent' ? 'sent' : msg.status === 'failed' ? 'failed' : 'pending'}">
                     <div class="message-header">
                         <strong>${msg.contact_name}</strong> (${msg.contact_phone})
@@ -758,7 +781,7 @@ async function loadPickupHistory(vinId) {
 
             historyContent.innerHTML = `
                 <div class="message-history-container">
-                    <h5>📱 Pickup Messages - ${history.vehicle_info} (${history.vin_string})</h5>
+                    <h5>📱 Pickup Messages - ${vinHeading(history.profile)}</h5>
                     ${historyHtml}
                 </div>
             `;
@@ -778,16 +801,16 @@ async function loadReminderHistory(vinId) {
     historyContent.innerHTML = '<p>Loading reminder history...</p>';
 
     try {
-        const result = await apiFetch(`/messages/vin/${vinId}/reminder-history`);
+        const result = await getVinDashboard(vinId);
         
         if (result.success) {
             const history = result.data;
-            if (history.reminder_history.length === 0) {
+            if (history.messages.reminder.length === 0) {
                 historyContent.innerHTML = '<p>No reminder messages found for this vehicle.</p>';
                 return;
             }
 
-            const historyHtml = history.reminder_history.map(msg => `
+            const historyHtml = history.messages.reminder.map(msg => `
                 <div class="message-history-item ${msg.status === 'sent' ? 'sent' : msg.status === 'failed' ? 'failed' : 'pending'}">
                     <div class="message-header">
                         <strong>${msg.contact_name}</strong> (${msg.contact_phone})
@@ -807,7 +830,7 @@ async function loadReminderHistory(vinId) {
 
             historyContent.innerHTML = `
                 <div class="message-history-container">
-                    <h5>🔄 Reminder Messages - ${history.vehicle_info} (${history.vin_string})</h5>
+                    <h5>🔄 Reminder Messages - ${vinHeading(history.profile)}</h5>
                     ${historyHtml}
                 </div>
             `;
@@ -853,10 +876,10 @@ async function loadSentReminderHistory(vinId) {
     historyContent.innerHTML = '<p>Loading sent reminders...</p>';
 
     try {
-        const result = await apiFetch(`/messages/vin/${vinId}/reminder-history`);
+        const result = await getVinDashboard(vinId);
         if (result.success) {
             const history = result.data;
-            const sentOnly = (history.reminder_history || []).filter(msg => msg.status === 'sent');
+            const sentOnly = history.messages.reminder.filter(msg => msg.status === 'sent');
             if (sentOnly.length === 0) {
                 historyContent.innerHTML = '<p>No sent reminders for this vehicle yet.</p>';
                 return;
@@ -882,7 +905,7 @@ async function loadSentReminderHistory(vinId) {
 
             historyContent.innerHTML = `
                 <div class="message-history-container">
-                    <h5>✅ Sent Reminders - ${history.vehicle_info} (${history.vin_string})</h5>
+                    <h5>✅ Sent Reminders - ${vinHeading(history.profile)}</h5>
                     ${historyHtml}
                 </div>
             `;
@@ -1320,7 +1343,7 @@ function setupPickupContactEvents(currentVinId, currentVinString, serviceRecord,
 // Helper functions that need to be global
 async function searchContacts(phoneNumber) {
     try {
-        const result = await apiFetch(`/contacts/search?phone_number=${phoneNumber}`);
+        const result = await apiFetch(`/contacts/search?phone_number=${encodeURIComponent(phoneNumber)}&limit=20`);
         if (result.success) {
             return result.data;
         } else {
@@ -1605,12 +1628,32 @@ document.addEventListener("DOMContentLoaded", () => {
         serviceRecordCreationDiv.style.display = "none";
 
         try {
-            const result = await apiFetch(`/vin/${vinOrLast6}`);
+            // Resolve partial VINs and plates first; let the user pick when several vehicles match
+            const lookup = await apiFetch(`/vin/lookup?q=${encodeURIComponent(vinOrLast6)}`);
+            if (lookup.success && lookup.data.length > 1 && lookup.data[0].match !== "vin" && lookup.data[0].match !== "plate") {
+                vinProfileDiv.innerHTML = `<h3>${lookup.data.length} vehicles match "${vinOrLast6}"</h3>` +
+                    lookup.data.map(c => `<div class="search-result-item" onclick="searchVin('${c.vin}')">
+                        <strong>${c.year} ${c.make} ${c.model}</strong> ${c.vin}${c.plate ? ` (${c.plate})` : ""}</div>`).join("");
+                vinProfileDiv.style.display = "block";
+                return;
+            }
+            let vinId = null;
+            if (lookup.success && lookup.data.length > 0) {
+                vinId = lookup.data[0].id;
+            } else {
+                // Short suffixes the lookup doesn't cover still resolve through the profile route
+                const profile = await apiFetch(`/vin/${encodeURIComponent(vinOrLast6)}`);
+                if (profile.success) vinId = profile.data.id;
+            }
+
+            // Always fetch fresh: contacts or messages may have changed since it was last opened
+            currentVinDashboard = null;
+            const result = vinId === null ? { success: false } : await getVinDashboard(vinId);
             if (result.success) {
-                displayVinProfile(result.data); // Renders HTML and calls setupVinProfileContactEvents
+                displayVinProfile(result.data.profile); // Renders HTML and calls setupVinProfileContactEvents
                 vinProfileDiv.style.display = "block"; // Show the VIN profile
                 serviceRecordCreationDiv.style.display = "block";
-                document.getElementById("service-vin").value = result.data.vin;
+                document.getElementById("service-vin").value = result.data.profile.vin;
             } else {
                 vinProfileDiv.innerHTML = "<p>VIN not found. Please create a new profile.</p>";
                 vinProfileDiv.style.display = "block"; // Show the "not found" message
@@ -1647,8 +1690,11 @@ document.addEventListener("DOMContentLoaded", () => {
                 document.getElementById("model").value = result.data.model || "";
                 document.getElementById("year").value = result.data.year || "";
                 document.getElementById("trim").value = result.data.trim || "";
+                if (result.data.source === "offline") {
+                    alert("VIN decode service is unavailable - filled in make and year only.");
+                }
             } else {
-                alert("Failed to decode VIN.");
+                alert(result.error?.detail || "Failed to decode VIN.");
             }
         } catch (error) {
             console.error("Error:", error);
@@ -1729,39 +1775,60 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- Display Function ---
 
-    function displayVinProfile(data) {
-        // Find the most recent service record
-        let mostRecentService = null;
-        if (data && data.service_records && Array.isArray(data.service_records) && data.service_records.length > 0) {
-            mostRecentService = data.service_records.reduce((latest, current) => {
-                const latestDate = new Date(latest.service_date);
-                const currentDate = new Date(current.service_date);
-                return currentDate > latestDate ? current : latest;
-            });
+    function renderServiceRecordCard(record, isMostRecent) {
+        return `
+            <div class="service-record-card" style="position: relative; padding-top: 50px;">
+                <div style="position: absolute; top: 8px; right: 8px; display: flex; gap: 6px; flex-wrap: wrap; justify-content: flex-end;">
+                    ${isMostRecent ? '<div style="background-color: #28a745; color: white; padding: 4px 8px; border-radius: 4px; font-size: 12px; font-weight: bold;">⭐ Most Recent</div>' : ''}
+                    <div id="pickup-badge-${record.id}" style="display:none; background-color: #0d6efd; color: white; padding: 4px 8px; border-radius: 4px; font-size: 12px; font-weight: bold;">📤 Pickup Sent</div>
+                </div>
+            <p><strong>Service Date:</strong> <span>${record.service_date}</span></p>
+            <p><strong>Mileage:</strong> <span>${record.mileage_at_service}</span></p>
+            <p><strong>Oil Type:</strong> <span>${record.oil_type}</span></p>
+            <p><strong>Oil Viscosity:</strong> <span>${record.oil_viscosity}</span></p>
+            <p><strong>Next Due (Miles):</strong> <span>${record.next_service_mileage_due}</span></p>
+            <p><strong>Next Due (Date):</strong> <span>${record.next_service_date_due}</span></p>
+            <p><strong>Notes:</strong> <span>${record.notes || 'N/A'}</span></p>
+            <button onclick="handlePickupFlow(${record.id})" style="background-color: #28a745; margin-top: 10px;">📱 Send Pickup Message</button>
+        </div>
+        `;
+    }
+
+    // Appends the next page of older service records below the ones already shown
+    async function loadOlderServiceRecords(vinId, cursor) {
+        const button = document.getElementById("load-older-services");
+        if (button) button.disabled = true;
+        const result = await apiFetch(`/vin/${vinId}/service-records?cursor=${encodeURIComponent(cursor)}`);
+        if (!result.success) {
+            alert(`Error: ${result.error?.detail || 'Could not load older service records'}`);
+            if (button) button.disabled = false;
+            return;
+        }
+        const container = document.querySelector("#vin-profile .service-records-container");
+        container.insertAdjacentHTML("beforeend", result.data.items.map(record => renderServiceRecordCard(record, false)).join(""));
+        setPickupSentBadges(result.data.items);
+        if (result.data.next_cursor) {
+            button.disabled = false;
+            button.onclick = () => loadOlderServiceRecords(vinId, result.data.next_cursor);
+        } else {
+            button.remove();
         }
+    }
+
+    function displayVinProfile(data) {
+        // Service records come back newest first
+        const mostRecentService = (data && data.service_records && data.service_records.length > 0) ? data.service_records[0] : null;
+        const summary = (data && data.summary) || {};
+
+        const serviceSummaryHtml = summary.service_count
+            ? `<p><strong>${summary.service_count}</strong> service${summary.service_count === 1 ? '' : 's'} on file. Last: ${summary.last_service_date} at ${summary.last_service_mileage} mi. Next due: ${summary.next_service_date_due} or ${summary.next_service_mileage_due} mi.</p>`
+            : "";
 
         const serviceRecordsHtml = (data && data.service_records && Array.isArray(data.service_records) && data.service_records.length > 0)
             ? `<div class="service-records-container">
-                    ${data.service_records.map(record => {
-                        const isMostRecent = mostRecentService && record.id === mostRecentService.id;
-                        return `
-                            <div class="service-record-card" style="position: relative; padding-top: 50px;">
-                                <div style="position: absolute; top: 8px; right: 8px; display: flex; gap: 6px; flex-wrap: wrap; justify-content: flex-end;">
-                                    ${isMostRecent ? '<div style="background-color: #28a745; color: white; padding: 4px 8px; border-radius: 4px; font-size: 12px; font-weight: bold;">⭐ Most Recent</div>' : ''}
-                                    <div id="pickup-badge-${record.id}" style="display:none; background-color: #0d6efd; color: white; padding: 4px 8px; border-radius: 4px; font-size: 12px; font-weight: bold;">📤 Pickup Sent</div>
-                                </div>
-                            <p><strong>Service Date:</strong> <span>${record.service_date}</span></p>
-                            <p><strong>Mileage:</strong> <span>${record.mileage_at_service}</span></p>
-                            <p><strong>Oil Type:</strong> <span>${record.oil_type}</span></p>
-                            <p><strong>Oil Viscosity:</strong> <span>${record.oil_viscosity}</span></p>
-                            <p><strong>Next Due (Miles):</strong> <span>${record.next_service_mileage_due}</span></p>
-                            <p><strong>Next Due (Date):</strong> <span>${record.next_service_date_due}</span></p>
-                            <p><strong>Notes:</strong> <span>${record.notes || 'N/A'}</span></p>
-                            <button onclick="handlePickupFlow(${record.id})" style="background-color: #28a745; margin-top: 10px;">📱 Send Pickup Message</button>
-                        </div>
-                        `;
-                    }).join("")}
-                </div>`
+                    ${data.service_records.map(record => renderServiceRecordCard(record, mostRecentService && record.id === mostRecentService.id)).join("")}
+                </div>
+                ${data.next_service_cursor ? `<button id="load-older-services" style="background-color: #6c757d;">Load older service records</button>` : ''}`
             : "<p>No service records found.</p>";
 
         const associatedContactsHtml = (data && data.contacts && Array.isArray(data.contacts) && data.contacts.length > 0)
@@ -1798,6 +1865,7 @@ document.addEventListener("DOMContentLoaded", () => {
                 <p><strong>Plate:</strong> <span>${data.plate || "N/A"}</span></p>
             </div>
             <h4>Service Records:</h4>
+            ${serviceSummaryHtml}
             ${serviceRecordsHtml}
 
             <h4>Associated Contacts:</h4>
@@ -1839,7 +1907,12 @@ document.addEventListener("DOMContentLoaded", () => {
         
         // Populate pickup-sent badges per service record
         if (data && data.service_records) {
-            data.service_records.forEach(sr => updatePickupSentBadge(sr.id));
+            setPickupSentBadges(data.service_records);
+        }
+
+        const loadOlderButton = document.getElementById("load-older-services");
+        if (loadOlderButton) {
+            loadOlderButton.onclick = () => loadOlderServiceRecords(data.id, data.next_service_cursor);
         }
 
         // Load the default message history
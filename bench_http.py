@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+HTTP benchmark for the front-desk and webhook routes, with latency percentiles.
+
+Boots app.main:app in-process against a freshly seeded benchmark database (an
+embedded SQLite file by default) with a fake SMS provider, drives a weighted mix
+of requests from concurrent clients and reports throughput and p50/p95/p99 per
+route. Results are written as JSON so runs can be compared against a baseline.
+
+Usage:
+    python bench_http.py --duration 30 --concurrency 16
+    python bench_http.py --mix vin_profile=6,webhook=3,send=1 --output bench_results/main.json
+    python bench_http.py --baseline bench_results/main.json --max-regression 15
+    python bench_http.py --database-url postgresql+asyncpg://localhost/autoshop_bench --vehicles 20000
+
+The benchmark database is dropped and re-seeded on every run (--no-seed keeps it),
+so never point --database-url at real shop data. It never reads DATABASE_URL.
+FAKE_SMS_LATENCY_MS (or --sms-latency-ms) makes each fake send block like a call
+to Twilio. With --url the requests go to a running server instead; that server
+must use the same database and its own SMS settings.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+TENANT = "montebello"
+PASSWORD = "mblnt25"
+SMS_NUMBER = "+15005550006"
+
+# Front-desk traffic is mostly VIN lookups; Twilio webhooks arrive alongside it
+DEFAULT_MIX = "vin_profile=6,all_outbound=1,webhook=3,send=1"
+
+
+class FakeSmsClient:
+    """Stands in for twilio.rest.Client. Blocks for the configured latency, as the real client does."""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+        self.sent = 0
+        self.messages = self
+
+    def create(self, to: str, from_: str, body: str):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.sent += 1
+        return SimpleNamespace(sid=f"SMFAKE{self.sent:026d}")
+
+
+def bench_vin(i: int) -> str:
+    # Unique last 8 so suffix lookups resolve to one vehicle
+    return f"1HGCM8{'ABCDEFGHJ'[i % 9]}{i // 9 % 100:02d}{i:08d}"
+
+
+def bench_phone(i: int) -> str:
+    return f"555{i:07d}"
+
+
+def seed_rows(vehicles: int, services_per_vehicle: int, rng: random.Random):
+    """Import rows (see bulk_import.py) for one owner per vehicle and a few oil changes each."""
+    today = date.today()
+    for i in range(vehicles):
+        mileage = rng.randint(5_000, 120_000)
+        # Latest visit within the last five months, so most vehicles have a reminder pending
+        service_date = today - timedelta(days=rng.randint(0, 150) + 180 * (services_per_vehicle - 1))
+        for _ in range(services_per_vehicle):
+            interval = rng.choice((3_000, 5_000, 7_500))
+            yield {
+                "vin": bench_vin(i), "make": "honda", "model": "accord", "year": 2010 + i % 15,
+                "contact_name": f"Customer {i}", "phone_number": bench_phone(i), "email": f"c{i}@example.com",
+                "service_date": service_date.isoformat(), "oil_type": "SYNTHETIC", "oil_viscosity": "0W-20",
+                "mileage_at_service": mileage, "next_service_mileage_due": mileage + interval,
+                "next_service_date_due": (service_date + timedelta(days=180)).isoformat(),
+            }
+            mileage += rng.randint(2_000, 6_000)
+            service_date += timedelta(days=180)
+
+
+async def reset_and_seed(args) -> None:
+    from sqlalchemy import text
+    from sqlmodel import SQLModel
+
+    from app.core.database import async_session, engine, init_db
+    from app.routes.bulk_import.bulk_import import BulkImporter
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+    await init_db()
+
+    started = time.perf_counter()
+    async with async_session() as session:
+        importer = BulkImporter(session, generate_reminders=True, tenant_id=TENANT)
+        async for progress in importer.run(seed_rows(args.vehicles, args.services, random.Random(args.seed))):
+            pass
+    print(
+        f"Seeded {progress['vins']} vehicles, {progress['service_records']} service records and "
+        f"{progress['reminders']} reminders in {time.perf_counter() - started:.1f}s"
+    )
+
+
+async def load_targets(limit: int = 2000) -> dict:
+    """Ids the workload picks from: (service record, owner) pairs for /messages/send."""
+    from sqlmodel import select
+
+    from app.core.database import async_session
+    from app.models.service_record import ServiceRecord
+    from app.models.vin_contact_link import VINContactLink
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(ServiceRecord.id, VINContactLink.contact_id)
+            .join(VINContactLink, VINContactLink.vin_id == ServiceRecord.vin_id)
+            .limit(limit)
+        )
+        pairs = result.all()
+    if not pairs:
+        raise SystemExit("The benchmark database is empty; run without --no-seed first.")
+    return {"send_pairs": pairs}
+
+
+def build_operations(vehicles: int, targets: dict):
+    """name -> function(rng) returning (method, url, request kwargs)."""
+    recent = (date.today() - timedelta(days=7)).isoformat()
+
+    def vin_profile(rng):
+        return "GET", f"/vin/{bench_vin(rng.randrange(vehicles))[-8:]}", {}
+
+    def all_outbound(rng):
+        return "GET", "/messages/all-outbound", {"params": {"date": recent}}
+
+    def webhook(rng):
+        form = {"From": f"+1{bench_phone(rng.randrange(vehicles))}", "To": SMS_NUMBER, "Body": "Is my car ready?"}
+        return "POST", "/webhooks/twilio/sms", {"data": form}
+
+    def send(rng):
+        service_record_id, contact_id = rng.choice(targets["send_pairs"])
+        body = {
+            "service_record_id": service_record_id,
+            "contact_id": contact_id,
+            "immediate_message_content": "Your vehicle is ready for pickup.",
+        }
+        return "POST", "/messages/send", {"json": body}
+
+    return {"vin_profile": vin_profile, "all_outbound": all_outbound, "webhook": webhook, "send": send}
+
+
+def parse_mix(mix: str, operations: dict) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in operations:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(operations)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def drive(client, operations: dict, weights: dict, concurrency: int, duration: float, seed: int) -> dict:
+    """Run `concurrency` clients for `duration` seconds. Returns per-operation latencies and statuses."""
+    names = list(weights)
+    cumulative = list(np.cumsum([weights[name] for name in names]))
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, cum_weights=cumulative)[0]
+            method, url, kwargs = operations[name](rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies[name].append(time.perf_counter() - started)
+            if failed:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return {"latencies": latencies, "errors": errors, "elapsed": time.perf_counter() - started}
+
+
+def summarize(samples: list, errors: int, elapsed: float) -> dict:
+    ms = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "mean_ms": round(float(ms.mean()), 2) if len(ms) else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2) if len(ms) else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """Print the change per route against a baseline run. False if any p95 regressed past max_regression %."""
+    ok = True
+    print(f"\nAgainst baseline {baseline['meta'].get('git_commit', '?')} ({baseline['meta'].get('started_at', '?')}):")
+    print(f"{'route':<14}{'p50':>10}{'p95':>10}{'p99':>10}{'rps':>10}")
+    for name, current in results["routes"].items():
+        previous = baseline["routes"].get(name)
+        if not previous:
+            print(f"{name:<14}{'(new)':>10}")
+            continue
+
+        def change(key):
+            return (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+
+        print(f"{name:<14}{change('p50_ms'):>+9.1f}%{change('p95_ms'):>+9.1f}%{change('p99_ms'):>+9.1f}%{change('throughput_rps'):>+9.1f}%")
+        if max_regression is not None and change("p95_ms") > max_regression:
+            ok = False
+    return ok
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.core import sms
+    from app.core.database import DIALECT, engine
+    from app.core.tenancy import tenant_id_var
+    from app.main import app
+
+    fake_sms = FakeSmsClient(args.sms_latency_ms / 1000)
+    sms.client = fake_sms
+
+    # Seed as the shop would (import_data.py does the same); the app's scheduler must not inherit it
+    token = tenant_id_var.set(TENANT)
+    try:
+        if not args.no_seed:
+            await reset_and_seed(args)
+        targets = await load_targets()
+    finally:
+        tenant_id_var.reset(token)
+    operations = build_operations(args.vehicles, targets)
+    weights = parse_mix(args.mix, operations)
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, auth=(TENANT, PASSWORD), timeout=30)
+        lifespan = None
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", auth=(TENANT, PASSWORD), timeout=30)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    try:
+        if args.warmup:
+            await drive(client, operations, weights, args.concurrency, args.warmup, args.seed + 1)
+        measured = await drive(client, operations, weights, args.concurrency, args.duration, args.seed)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        # The app's background scheduler has no shutdown hook of its own
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+        await engine.dispose()
+
+    elapsed = measured["elapsed"]
+    all_samples = [s for samples in measured["latencies"].values() for s in samples]
+    return {
+        "meta": {
+            "started_at": started_at,
+            "git_commit": git_commit(),
+            "target": args.url or "in-process",
+            "database": DIALECT,
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": weights,
+            "vehicles": args.vehicles,
+            "services_per_vehicle": args.services,
+            "sms_latency_ms": args.sms_latency_ms,
+            "sms_sent": fake_sms.sent,
+        },
+        "routes": {
+            name: summarize(measured["latencies"][name], measured["errors"][name], elapsed)
+            for name in weights
+        },
+        "total": summarize(all_samples, sum(measured["errors"].values()), elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API routes and report latency percentiles.")
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///./bench.db", help="benchmark database; dropped and re-seeded")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--vehicles", type=int, default=2000, help="vehicles to seed, one owner each")
+    parser.add_argument("--services", type=int, default=3, help="service records per vehicle")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data from the previous run")
+    parser.add_argument("--sms-latency-ms", type=float, default=float(os.getenv("FAKE_SMS_LATENCY_MS", "0")))
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the data and the request mix")
+    parser.add_argument("--output", help="results file (default bench_results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, help="exit 1 if any route's p95 grew by more than this %% vs --baseline")
+    args = parser.parse_args()
+
+    # Must be in place before the app modules create their engines and read .env
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ["TWILIO_PHONE_NUMBER"] = SMS_NUMBER
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = asyncio.run(run(args))
+
+    print(f"\n{'route':<14}{'requests':>10}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in [*results["routes"].items(), ("total", results["total"])]:
+        print(f"{name:<14}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+
+    output = args.output or os.path.join("bench_results", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            print(f"p95 regressed by more than {args.max_regression}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 import asyncio
 import os
 from sqlmodel import SQLModel
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
 
@@ -12,10 +13,12 @@ from app.models.contact import Contact
 from app.models.vin_contact_link import VINContactLink
 from app.models.scheduled_message import ScheduledMessage
 from app.models.incoming_message import IncomingMessage
+from app.models.vin_decode import VinDecode, VinPatternDecode
 
 async def create_db_and_tables():
     """
     One-time script to create all database tables based on the SQLModel metadata.
+    The migration history is reset too, so the next app start re-applies every migration.
     """
     load_dotenv()
     db_url = os.getenv("DATABASE_URL")
@@ -29,6 +32,7 @@ async def create_db_and_tables():
     async with engine.begin() as conn:
         print("Dropping all existing tables (if they exist)...")
         await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
         print("Creating all tables...")
         await conn.run_sync(SQLModel.metadata.create_all)
         print("Tables created successfully.")
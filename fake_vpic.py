@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the NHTSA vPIC API, for development and load tests without
+depending on (or hammering) the real service.
+
+Usage:
+    uvicorn fake_vpic:app --port 8081
+    VPIC_BASE_URL=http://127.0.0.1:8081/api/vehicles uvicorn app.main:app
+
+Answers are deterministic: make from the bundled WMI table, year from position 10
+and a model derived from the vehicle descriptor section. FAKE_VPIC_LATENCY_MS adds
+a delay per call and FAKE_VPIC_FAIL_RATE (0-1) makes a share of calls return 500.
+"""
+
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, Form, HTTPException
+
+from app.core.vin_offline import decode_offline
+
+LATENCY_SECONDS = float(os.getenv("FAKE_VPIC_LATENCY_MS", "0")) / 1000
+FAIL_RATE = float(os.getenv("FAKE_VPIC_FAIL_RATE", "0"))
+
+app = FastAPI(title="Fake vPIC")
+stats = {"decode_vin": 0, "decode_batch": 0, "batch_vins": 0}
+
+
+def fake_values(vin: str) -> dict:
+    decoded = decode_offline(vin.upper())
+    return {
+        "VIN": vin.upper(),
+        "Make": decoded["make"] or "UNKNOWN",
+        "Model": f"MODEL {vin[3:8].upper()}",
+        "ModelYear": str(decoded["year"] or ""),
+        "Trim": "BASE",
+        "ErrorCode": "0",
+    }
+
+
+async def simulate_network():
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        raise HTTPException(status_code=500, detail="Simulated vPIC failure")
+
+
+@app.get("/api/vehicles/DecodeVin/{vin}")
+async def decode_vin(vin: str, format: str = "json"):
+    await simulate_network()
+    stats["decode_vin"] += 1
+    values = fake_values(vin)
+    variables = {"Make": values["Make"], "Model": values["Model"], "Model Year": values["ModelYear"], "Trim": values["Trim"]}
+    return {
+        "Count": len(variables),
+        "Message": "Results returned successfully",
+        "SearchCriteria": f"VIN:{vin}",
+        "Results": [{"Variable": name, "Value": value} for name, value in variables.items()],
+    }
+
+
+@app.post("/api/vehicles/DecodeVINValuesBatch/")
+async def decode_vin_values_batch(data: str = Form(...), format: str = Form("json")):
+    vins = [vin.strip() for vin in data.split(";") if vin.strip()]
+    if len(vins) > 50:
+        raise HTTPException(status_code=400, detail="At most 50 VINs per batch")
+    await simulate_network()
+    stats["decode_batch"] += 1
+    stats["batch_vins"] += len(vins)
+    return {
+        "Count": len(vins),
+        "Message": "Results returned successfully",
+        "SearchCriteria": None,
+        "Results": [fake_values(vin) for vin in vins],
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Synthetic shop data at a chosen scale, for performance work on realistic volumes.
+
+Usage:
+    python generate_data.py --scale 1 --reset
+    python generate_data.py --scale 20 --seed 7 --tenants montebello,eastlube
+
+Scale 1 is about 10,000 vehicles per shop: ~9,500 contacts with unique normalized
+phones, 1-2 owners per vehicle, several years of oil changes each, a pickup text and
+a reminder per visit, and inbound replies. VINs carry valid check digits and model
+year codes. The same seed and scale always produce the same rows.
+
+Rows are loaded with COPY on PostgreSQL and executemany inserts on SQLite, one
+transaction per batch of vehicles, so scale 20 (several million rows) loads in
+minutes. --reset drops all tables first, like create_table.py, and builds the
+secondary indexes and foreign keys after the load instead of row by row.
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from dotenv import load_dotenv
+
+VEHICLES_PER_SCALE = 10_000
+# Share of vehicles whose owner already has another car at the shop
+SHARED_OWNER_RATE = 0.15
+# Share of vehicles with a second driver who also gets texts
+SECOND_DRIVER_RATE = 0.10
+HISTORY_YEARS = 6
+
+FIRST_NAMES = (
+    "Maria", "Jose", "Juan", "Ana", "Luis", "Carmen", "Carlos", "Rosa", "Jorge", "Elena", "David", "Laura",
+    "Miguel", "Sofia", "James", "Linda", "Robert", "Patricia", "Michael", "Jennifer", "Daniel", "Karen",
+    "Kevin", "Nancy", "Brian", "Lisa", "Steven", "Susan", "Thomas", "Angela", "Victor", "Gloria",
+)
+LAST_NAMES = (
+    "Garcia", "Hernandez", "Lopez", "Martinez", "Gonzalez", "Rodriguez", "Perez", "Sanchez", "Ramirez", "Torres",
+    "Flores", "Rivera", "Gomez", "Diaz", "Reyes", "Cruz", "Morales", "Ortiz", "Gutierrez", "Chavez",
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Anderson", "Kim", "Nguyen", "Lee",
+)
+# Los Angeles area codes; the rest of the number comes from the contact's index
+AREA_CODES = ("323", "213", "310", "626", "818", "562", "714", "909")
+# (WMI, make, models) weighted roughly like a neighbourhood lube shop's customers
+VEHICLE_TYPES = (
+    ("1HG", "HONDA", ("CIVIC", "ACCORD")), ("5FN", "HONDA", ("ODYSSEY", "PILOT")), ("5J6", "HONDA", ("CR-V",)),
+    ("4T1", "TOYOTA", ("CAMRY", "COROLLA")), ("5TD", "TOYOTA", ("SIENNA", "HIGHLANDER")), ("2T3", "TOYOTA", ("RAV4",)),
+    ("1N4", "NISSAN", ("ALTIMA", "SENTRA")), ("1FA", "FORD", ("FUSION", "MUSTANG")), ("1FT", "FORD", ("F-150",)),
+    ("1G1", "CHEVROLET", ("MALIBU", "CRUZE")), ("3GN", "CHEVROLET", ("EQUINOX",)), ("KMH", "HYUNDAI", ("ELANTRA", "SONATA")),
+    ("KNA", "KIA", ("FORTE", "OPTIMA")), ("JM1", "MAZDA", ("MAZDA3",)), ("WBA", "BMW", ("328I",)), ("5YJ", "TESLA", ("MODEL 3",)),
+)
+# (oil type, mileage interval, days interval)
+OIL_CHANGES = (("CONVENTIONAL", 3_000, 90), ("SYNTHETIC BLEND", 5_000, 150), ("SYNTHETIC", 7_500, 180))
+VISCOSITIES = ("0W-20", "5W-20", "5W-30", "0W-16", "10W-30")
+INBOUND_BODIES = (
+    "Is my car ready?", "Thanks!", "What time do you close today?", "Can I come in tomorrow morning?",
+    "STOP", "How much is an oil change?", "Ok see you soon", "Do I need an appointment?",
+)
+VIN_LETTERS = "ABCDEFGHJKLMNPRSTUVWXYZ"
+VIN_CHARS = VIN_LETTERS + string.digits
+# Position 10 codes for model years 2000-2025 (digits 1-9 then letters again from 2010)
+MODEL_YEARS = range(2000, 2026)
+
+CONTACT_COLUMNS = ("id", "tenant_id", "name", "phone_number", "email")
+VIN_COLUMNS = ("id", "tenant_id", "vin", "make", "model", "year", "trim", "plate")
+LINK_COLUMNS = ("vin_id", "contact_id", "tenant_id")
+SERVICE_RECORD_COLUMNS = (
+    "id", "tenant_id", "vin_id", "service_date", "oil_type", "oil_viscosity", "mileage_at_service",
+    "next_service_mileage_due", "next_service_date_due", "notes",
+)
+MESSAGE_COLUMNS = (
+    "id", "tenant_id", "contact_id", "vin_id", "service_record_id", "message_content",
+    "scheduled_time", "created_at", "sent_at", "status", "is_reminder",
+)
+INBOUND_COLUMNS = ("id", "tenant_id", "from_number", "to_number", "body", "created_at", "is_read", "contact_id")
+
+
+def make_vin(rng: random.Random, wmi: str, year: int, serial: int) -> str:
+    from app.core.vin_offline import MODEL_YEAR_CODES, check_digit
+
+    # From 2010 position 7 is a letter, which tells the 30-year year cycles apart
+    descriptor = "".join(rng.choice(VIN_CHARS) for _ in range(3))
+    descriptor += rng.choice(VIN_LETTERS if year >= 2010 else string.digits)
+    descriptor += rng.choice(VIN_CHARS)
+    plant = VIN_CHARS[serial // 1_000_000 % len(VIN_CHARS)]
+    vin = f"{wmi}{descriptor}0{MODEL_YEAR_CODES[(year - 1980) % 30]}{plant}{serial % 1_000_000:06d}"
+    return vin[:8] + check_digit(vin) + vin[9:]
+
+
+def make_plate(rng: random.Random) -> str:
+    return f"{rng.randint(4, 9)}{''.join(rng.choice(VIN_LETTERS) for _ in range(3))}{rng.randint(0, 999):03d}"
+
+
+def phone_for(index: int) -> str:
+    # Unique per contact index: area code cycles, the 7-digit local number counts up from 200-0000
+    return f"{AREA_CODES[index % len(AREA_CODES)]}{2_000_000 + index // len(AREA_CODES)}"
+
+
+class TenantGenerator:
+    """
+    Builds one shop's rows batch by batch. Ids continue from what's already in each
+    table, and phones, emails and VIN serials from the shop's existing contacts and
+    vehicles, so a run without --reset adds to earlier ones instead of colliding.
+    """
+
+    def __init__(self, tenant_id: str, seed: int, first_ids: dict, today: date, contacts: int = 0, vehicles: int = 0):
+        from app.core.tenancy import shop_for
+
+        self.tenant_id = tenant_id
+        self.shop = shop_for(tenant_id)
+        self.rng = random.Random(f"{seed}:{tenant_id}")
+        self.next_ids = dict(first_ids)
+        self.today = today
+        self.now = datetime.combine(today, datetime.min.time()) + timedelta(hours=12)
+        self.contacts = contacts
+        self.vehicles = vehicles
+        self.owner = None
+
+    def take_id(self, table: str) -> int:
+        self.next_ids[table] += 1
+        return self.next_ids[table]
+
+    def new_contact(self, rows: dict) -> tuple:
+        rng = self.rng
+        contact_id = self.take_id("contact")
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone = phone_for(self.contacts)
+        email = f"{name.replace(' ', '.').lower()}{self.contacts}@example.com" if rng.random() < 0.7 else None
+        self.contacts += 1
+        rows["contact"].append((contact_id, self.tenant_id, name, phone, email))
+
+        # Some customers text back: mostly read, the last few days still unread
+        for _ in range(rng.choice((0, 0, 0, 0, 0, 0, 0, 1, 1, 2))):
+            created_at = self.now - timedelta(days=rng.uniform(0, 365 * 2))
+            rows["incomingmessage"].append((
+                self.take_id("incomingmessage"), self.tenant_id, f"+1{phone}", self.shop.sms_number or "+15005550006",
+                rng.choice(INBOUND_BODIES), created_at, created_at < self.now - timedelta(days=3) or rng.random() < 0.5, contact_id,
+            ))
+        return contact_id, name
+
+    def vehicle(self, rows: dict) -> None:
+        from app.core.reminders import build_reminder_message, reminder_send_time
+
+        rng = self.rng
+        if self.owner is None or rng.random() >= SHARED_OWNER_RATE:
+            self.owner = self.new_contact(rows)
+        owner_id, owner_name = self.owner
+
+        wmi, make, models = rng.choice(VEHICLE_TYPES)
+        model = rng.choice(models)
+        year = rng.choice(MODEL_YEARS)
+        vin_id = self.take_id("vin")
+        rows["vin"].append((
+            vin_id, self.tenant_id, make_vin(rng, wmi, year, self.vehicles), make, model, year,
+            rng.choice((None, None, "BASE", "LX", "SE", "LIMITED")), make_plate(rng) if rng.random() < 0.8 else None,
+        ))
+        self.vehicles += 1
+        rows["vincontactlink"].append((vin_id, owner_id, self.tenant_id))
+        if rng.random() < SECOND_DRIVER_RATE:
+            rows["vincontactlink"].append((vin_id, self.new_contact(rows)[0], self.tenant_id))
+
+        # Oil changes from a random start until today at a steady miles/day, visits roughly on schedule
+        oil_type, mileage_interval, days_interval = rng.choice(OIL_CHANGES)
+        viscosity = rng.choice(VISCOSITIES)
+        miles_per_day = rng.uniform(15, 60)
+        mileage = rng.randint(5_000, 150_000)
+        service_date = self.today - timedelta(days=rng.randint(30, 365 * HISTORY_YEARS))
+        visits = []
+        while service_date <= self.today:
+            visits.append((service_date, mileage))
+            gap = int(days_interval * rng.uniform(0.7, 1.6))
+            service_date += timedelta(days=gap)
+            mileage += int(gap * miles_per_day)
+
+        for number, (service_date, mileage) in enumerate(visits):
+            record_id = self.take_id("servicerecord")
+            next_date = service_date + timedelta(days=days_interval)
+            rows["servicerecord"].append((
+                record_id, self.tenant_id, vin_id, service_date, oil_type, viscosity, mileage,
+                mileage + mileage_interval, next_date, None,
+            ))
+
+            pickup_time = datetime.combine(service_date, datetime.min.time()) + timedelta(hours=rng.uniform(16, 24))
+            pickup_sent = rng.random() < 0.96
+            rows["scheduledmessage"].append((
+                self.take_id("scheduledmessage"), self.tenant_id, owner_id, vin_id, record_id,
+                f"Hi {owner_name}, your {make} {model} is ready for pickup. - {self.shop.name}",
+                pickup_time, pickup_time, pickup_time if pickup_sent else None, "sent" if pickup_sent else "failed", False,
+            ))
+
+            # A later visit cancels the pending reminder; past ones went out, future ones wait
+            reminder_time = reminder_send_time(next_date)
+            next_visit = visits[number + 1][0] if number + 1 < len(visits) else None
+            if next_visit and next_visit <= reminder_time.date():
+                status, sent_at = "canceled", None
+            elif reminder_time <= self.now:
+                status = "sent" if rng.random() < 0.94 else "failed"
+                sent_at = reminder_time + timedelta(seconds=rng.randint(1, 90)) if status == "sent" else None
+            else:
+                status, sent_at = "pending", None
+            rows["scheduledmessage"].append((
+                self.take_id("scheduledmessage"), self.tenant_id, owner_id, vin_id, record_id,
+                build_reminder_message(owner_name, make, model, mileage + mileage_interval, next_date, self.shop.signature),
+                reminder_time, pickup_time, sent_at, status, True,
+            ))
+
+    def batch(self, vehicles: int) -> dict:
+        rows = {table: [] for table in LOAD_ORDER}
+        for _ in range(vehicles):
+            self.vehicle(rows)
+        return rows
+
+
+# Parents before children so foreign keys hold inside each batch
+LOAD_ORDER = {
+    "contact": CONTACT_COLUMNS,
+    "vin": VIN_COLUMNS,
+    "vincontactlink": LINK_COLUMNS,
+    "servicerecord": SERVICE_RECORD_COLUMNS,
+    "scheduledmessage": MESSAGE_COLUMNS,
+    "incomingmessage": INBOUND_COLUMNS,
+}
+ID_TABLES = ("contact", "vin", "servicerecord", "scheduledmessage", "incomingmessage")
+
+
+async def load_rows(conn, table: str, columns: tuple, rows: list) -> None:
+    from sqlalchemy import insert
+    from sqlmodel import SQLModel
+
+    if not rows:
+        return
+    if conn.dialect.name == "sqlite":
+        # No COPY; a Core executemany is SQLite's bulk path
+        await conn.execute(insert(SQLModel.metadata.tables[table]), [dict(zip(columns, row)) for row in rows])
+        return
+    raw_connection = await conn.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(table, records=rows, columns=columns)
+
+
+async def defer_indexes_and_foreign_keys(conn) -> list:
+    """
+    Drop the data tables' secondary indexes (and on PostgreSQL their foreign keys),
+    returning the statements that restore them. Building an index or validating a
+    foreign key once after the load is far cheaper than maintaining it row by row,
+    the same order pg_restore uses. Only for freshly reset tables.
+    """
+    from sqlalchemy import text
+
+    tables = list(LOAD_ORDER)
+    if conn.dialect.name == "sqlite":
+        # SQLite can't drop a foreign key; its per-row checks are cheap anyway
+        indexes = (await conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({})".format(
+                ", ".join(f"'{table}'" for table in tables))
+        ))).all()
+        foreign_keys = []
+    else:
+        indexes = (await conn.execute(text(
+            "SELECT i.indexname, i.indexdef FROM pg_indexes i "
+            "WHERE i.schemaname = current_schema() AND i.tablename = ANY(:tables) "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)"
+        ), {"tables": tables})).all()
+        foreign_keys = (await conn.execute(text(
+            "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid::regclass::text = ANY(:tables)"
+        ), {"tables": tables})).all()
+
+    for table, name, _ in foreign_keys:
+        await conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+    for name, _ in indexes:
+        await conn.execute(text(f'DROP INDEX "{name}"'))
+    return [definition for _, definition in indexes] + [
+        f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}' for table, name, definition in foreign_keys
+    ]
+
+
+async def run_each(engine, statements: list) -> None:
+    """Run each statement in its own transaction, reporting failures instead of stopping at the first."""
+    from sqlalchemy import text
+
+    for statement in statements:
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(statement))
+        except Exception as error:
+            print(f"FAILED: {statement}\n   {error}", file=sys.stderr)
+
+
+async def generate(scale: float, seed: int, tenants: list, batch_vehicles: int, reset: bool) -> None:
+    # Imported here so DATABASE_URL from .env is loaded before the engine is created
+    from sqlalchemy import text
+    from sqlmodel import SQLModel
+
+    from app.core.database import engine, init_db
+
+    if reset:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+            await conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+    await init_db()
+
+    deferred = []
+    if reset:
+        async with engine.begin() as conn:
+            deferred = await defer_indexes_and_foreign_keys(conn)
+
+    async with engine.connect() as conn:
+        first_ids = {table: (await conn.execute(text(f"SELECT coalesce(max(id), 0) FROM {table}"))).scalar() for table in ID_TABLES}
+        existing = {
+            tenant_id: [
+                (await conn.execute(text(f"SELECT count(*) FROM {table} WHERE tenant_id = :tenant_id"), {"tenant_id": tenant_id})).scalar()
+                for table in ("contact", "vin")
+            ]
+            for tenant_id in tenants
+        }
+
+    today = date.today()
+    vehicles_per_tenant = int(VEHICLES_PER_SCALE * scale)
+    totals = {table: 0 for table in LOAD_ORDER}
+    started = time.perf_counter()
+    try:
+        for tenant_id in tenants:
+            contacts, vehicles = existing[tenant_id]
+            generator = TenantGenerator(tenant_id, seed, first_ids, today, contacts, vehicles)
+            remaining = vehicles_per_tenant
+            while remaining > 0:
+                rows = generator.batch(min(batch_vehicles, remaining))
+                remaining -= batch_vehicles
+                async with engine.begin() as conn:
+                    for table, columns in LOAD_ORDER.items():
+                        await load_rows(conn, table, columns, rows[table])
+                for table in LOAD_ORDER:
+                    totals[table] += len(rows[table])
+                print(
+                    f"[{time.perf_counter() - started:7.1f}s] {tenant_id}: {generator.vehicles - vehicles}/{vehicles_per_tenant} vehicles, "
+                    f"{sum(totals.values())} rows so far"
+                )
+            first_ids = generator.next_ids
+    finally:
+        # Also after a failed batch: the migrations are already recorded as applied,
+        # so nothing else would put the dropped indexes and foreign keys back
+        if deferred:
+            print(f"Rebuilding indexes and foreign keys ({len(deferred)} statements)...")
+        restore = list(deferred)
+        if engine.dialect.name == "postgresql":
+            # Ids were assigned here, so move the serial sequences past them
+            restore += [
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))" for table in ID_TABLES
+            ]
+        # Fresh planner statistics, or the first benchmark runs plan against empty tables
+        await run_each(engine, restore + ["ANALYZE"])
+        await engine.dispose()
+
+    print(f"Loaded {sum(totals.values())} rows in {time.perf_counter() - started:.1f}s:")
+    for table, count in totals.items():
+        print(f"   {table}: {count}")
+
+
+def main():
+    from app.core.tenancy import SHOPS
+
+    parser = argparse.ArgumentParser(description="Generate synthetic shop data at a given scale.")
+    parser.add_argument("--scale", type=float, default=1, help=f"{VEHICLES_PER_SCALE} vehicles per shop per unit")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tenants", default=",".join(SHOPS), help="comma-separated shops to fill")
+    parser.add_argument("--batch-vehicles", type=int, default=5_000, help="vehicles per COPY/insert transaction")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    asyncio.run(generate(args.scale, args.seed, [t.strip() for t in args.tenants.split(",") if t.strip()], args.batch_vehicles, args.reset))
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Bulk import of historical vehicles, owners and service records for onboarding a shop.
+
+Usage:
+    python import_data.py customers.csv --tenant montebello
+    python import_data.py history.ndjson --tenant eastlube --reminders
+    cat history.csv | python import_data.py - --format csv --tenant montebello
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from dotenv import load_dotenv
+
+
+async def run_import(path: str, fmt: str, generate_reminders: bool, batch_size: int, tenant_id: str):
+    # Imported here so DATABASE_URL from .env is loaded before the engine is created
+    from app.core.database import async_session, engine
+    from app.routes.bulk_import.bulk_import import BulkImporter, read_rows
+    from app.core.tenancy import tenant_id_var
+
+    # Scope the importer's lookups to the shop, as a request would
+    tenant_id_var.set(tenant_id)
+
+    source = sys.stdin.buffer if path == "-" else open(path, "rb")
+    started = time.perf_counter()
+    progress = None
+    try:
+        async with async_session() as session:
+            importer = BulkImporter(session, generate_reminders=generate_reminders, batch_size=batch_size, tenant_id=tenant_id)
+            async for progress in importer.run(read_rows(source, fmt)):
+                elapsed = time.perf_counter() - started
+                print(
+                    f"[{elapsed:7.1f}s] {progress['stage']}: {progress['rows']} rows, "
+                    f"{progress['vins']} VINs, {progress['contacts']} contacts, "
+                    f"{progress['service_records']} service records, {progress['reminders']} reminders"
+                )
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        await engine.dispose()
+
+    if progress and progress["invalid_rows"]:
+        print(f"Skipped {progress['invalid_rows']} invalid rows:")
+        for error in progress["errors"]:
+            print(f"   row {error['row']}: {error['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import VINs, contacts and service records.")
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--tenant", required=True, help="shop the data belongs to, e.g. montebello")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--reminders", action="store_true", help="schedule upcoming service reminders")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl", ".json")) else "csv")
+    load_dotenv()
+    asyncio.run(run_import(args.path, fmt, args.reminders, args.batch_size, args.tenant))
+
+
+if __name__ == "__main__":
+    main()
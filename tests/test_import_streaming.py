@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir.name}/test.db"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app.core.database import engine  # noqa: E402
+from app.core.responses import StreamingSafeGZipMiddleware  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routes.bulk_import.bulk_import import IMPORT_BATCH_SIZE, BulkImporter  # noqa: E402
+
+CSV_HEADER = (
+    "vin,make,model,year,contact_name,phone_number,service_date,oil_type,oil_viscosity,"
+    "mileage_at_service,next_service_mileage_due,next_service_date_due\n"
+)
+
+
+def import_csv(rows: int) -> bytes:
+    lines = [
+        f"1HGCM8{i:011d},honda,accord,2015,Owner {i},(323) {i // 10000:03d}-{i % 10000:04d},2024-01-05,SYNTHETIC,0W-20,20000,25000,2024-07-05\n"
+        for i in range(rows)
+    ]
+    return (CSV_HEADER + "".join(lines)).encode()
+
+
+async def call(asgi_app, method: str, path: str, body: bytes = b"", headers=()) -> list:
+    """Run one request through asgi_app and return every message it sent, in order."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    requested = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # The client stays connected; streaming responses watch for a disconnect
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        requested = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi_app(scope, receive, send)
+    return messages
+
+
+def response_headers(messages: list) -> dict:
+    return {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+
+
+class ImportProgressStreamingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.lifespan = app.router.lifespan_context(app)
+        await self.lifespan.__aenter__()
+
+    async def asyncTearDown(self):
+        await self.lifespan.__aexit__(None, None, None)
+        # aiosqlite connections each hold a thread that would keep the process alive
+        await engine.dispose()
+
+    async def post_import(self, rows: int) -> list:
+        auth = base64.b64encode(b"montebello:mblnt25").decode()
+        return await call(
+            app, "POST", "/import/", import_csv(rows),
+            headers=[("Accept-Encoding", "gzip"), ("Authorization", f"Basic {auth}"), ("Content-Type", "text/csv")],
+        )
+
+    async def test_progress_lines_arrive_one_at_a_time_with_gzip_accepted(self):
+        messages = await self.post_import(IMPORT_BATCH_SIZE * 2 + 1)
+
+        self.assertEqual(messages[0]["status"], 200)
+        headers = response_headers(messages)
+        self.assertTrue(headers["content-type"].startswith("application/x-ndjson"))
+        self.assertNotIn("content-encoding", headers)
+
+        chunks = [m["body"] for m in messages[1:] if m["type"] == "http.response.body" and m.get("body")]
+        # Each progress snapshot goes out in its own body message as it is produced
+        self.assertGreaterEqual(len(chunks), 3)
+        stages = []
+        for chunk in chunks:
+            self.assertTrue(chunk.endswith(b"\n"))
+            self.assertEqual(chunk.count(b"\n"), 1)
+            stages.append(json.loads(chunk)["stage"])
+        self.assertEqual(stages[:2], ["importing", "importing"])
+        self.assertEqual(stages[-1], "imported")
+
+    async def test_failed_batch_ends_the_stream_with_an_error_line(self):
+        flush = BulkImporter.flush
+        calls = 0
+
+        async def failing_flush(importer, batch):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError("database went away")
+            await flush(importer, batch)
+
+        with mock.patch.object(BulkImporter, "flush", failing_flush), self.assertLogs("app.routes.bulk_import.bulk_import", "ERROR"):
+            messages = await self.post_import(IMPORT_BATCH_SIZE * 2 + 1)
+
+        self.assertEqual(messages[0]["status"], 200)
+        lines = [json.loads(m["body"]) for m in messages[1:] if m["type"] == "http.response.body" and m.get("body")]
+        self.assertEqual([line["stage"] for line in lines], ["importing", "error"])
+        self.assertIn("error", lines[-1])
+        # Only the batch committed before the failure is counted
+        self.assertEqual(lines[-1]["rows"], IMPORT_BATCH_SIZE)
+
+
+class GZipStillAppliesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_large_json_response_is_compressed(self):
+        async def listing(request):
+            return JSONResponse({"messages": ["x" * 100] * 100})
+
+        wrapped = StreamingSafeGZipMiddleware(Starlette(routes=[Route("/", listing)]), minimum_size=1024)
+        messages = await call(wrapped, "GET", "/", headers=[("Accept-Encoding", "gzip")])
+        self.assertEqual(response_headers(messages).get("content-encoding"), "gzip")
+
+
+if __name__ == "__main__":
+    unittest.main()